@@ -0,0 +1,199 @@
+"""
+Admission control for the expensive endpoints.
+
+Resume parsing and matching hold a threadpool worker for a long time. Without
+a limit, a burst of them takes every worker and the cheap endpoints (admin
+lists, stats) time out behind them. Each limited route group gets a fixed
+number of concurrent slots and a bounded FIFO wait queue. Match lookups,
+match streams and batch matching are separate groups: a stream or a batch
+runs for many times as long as a lookup, and sharing slots and a service
+time average with them would make ordinary lookups queue behind them and be
+rejected on their expected wait.
+
+Within a group:
+
+- a request that finds a free slot runs immediately;
+- a request that finds the queue full is rejected with 429;
+- a request whose expected wait (its queue position times the recent average
+  service time) exceeds ADMISSION_MAX_WAIT_SECONDS is rejected with 503 right
+  away instead of waiting to time out, and one that does wait longer than
+  that is rejected with 503 as well.
+
+Rejections carry Retry-After. Slots are held until the response body has been
+sent, so streamed responses count for their whole duration. Queue depth and
+rejection counters are exposed through stats() at GET /admin/admission.
+"""
+
+import asyncio
+import math
+import os
+import time
+from collections import deque
+
+import orjson
+
+ADMISSION_MAX_WAIT_SECONDS = float(os.environ.get("ADMISSION_MAX_WAIT_SECONDS", "5"))
+ADMISSION_QUEUE = int(os.environ.get("ADMISSION_QUEUE", "32"))
+ADMISSION_UPLOAD_CONCURRENCY = int(os.environ.get("ADMISSION_UPLOAD_CONCURRENCY", "4"))
+ADMISSION_MATCH_CONCURRENCY = int(os.environ.get("ADMISSION_MATCH_CONCURRENCY", "8"))
+ADMISSION_STREAM_CONCURRENCY = int(os.environ.get("ADMISSION_STREAM_CONCURRENCY", "4"))
+ADMISSION_BATCH_CONCURRENCY = int(os.environ.get("ADMISSION_BATCH_CONCURRENCY", "2"))
+
+# Weight of the newest request in the service time moving average
+_SERVICE_TIME_ALPHA = 0.2
+
+
+class Rejected(Exception):
+    def __init__(self, status_code: int, detail: str, retry_after: int):
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class AdmissionLimit:
+    """Concurrency slots plus a bounded wait queue for one group of routes."""
+
+    def __init__(self, name: str, prefixes, max_concurrent: int,
+                 max_queue: int = ADMISSION_QUEUE, max_wait: float = ADMISSION_MAX_WAIT_SECONDS,
+                 suffix: str = ""):
+        self.name = name
+        self.prefixes = tuple(prefixes)
+        self.suffix = suffix  # Also required at the end of the path, if set
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queue = max(0, max_queue)
+        self.max_wait = max_wait
+        self.active = 0
+        self.waiters = deque()
+        self.service_seconds = None  # Moving average, unknown until a request finishes
+        self.admitted = 0
+        self.rejected_queue_full = 0
+        self.rejected_wait = 0
+
+    def matches(self, path: str) -> bool:
+        return path.startswith(self.prefixes) and path.endswith(self.suffix)
+
+    def expected_wait(self, position: int) -> float:
+        """Seconds until the request at this queue position (1-based) gets a slot."""
+        if self.service_seconds is None:
+            return 0.0
+        return position * self.service_seconds / self.max_concurrent
+
+    def retry_after(self) -> int:
+        return max(1, math.ceil(self.expected_wait(len(self.waiters) + 1)))
+
+    async def acquire(self):
+        if self.active < self.max_concurrent and not self.waiters:
+            self.active += 1
+            self.admitted += 1
+            return
+        if len(self.waiters) >= self.max_queue:
+            self.rejected_queue_full += 1
+            raise Rejected(429, f"Too many {self.name} requests queued", self.retry_after())
+        if self.expected_wait(len(self.waiters) + 1) > self.max_wait:
+            self.rejected_wait += 1
+            raise Rejected(503, f"{self.name} is overloaded", self.retry_after())
+
+        waiter = asyncio.get_running_loop().create_future()
+        self.waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.max_wait)
+        except asyncio.TimeoutError:
+            if waiter.done():
+                # Granted a slot just as the wait ran out: take it
+                self.admitted += 1
+                return
+            waiter.cancel()
+            self.waiters.remove(waiter)
+            self.rejected_wait += 1
+            raise Rejected(503, f"{self.name} is overloaded", self.retry_after())
+        except asyncio.CancelledError:
+            # The client went away while queued
+            if waiter.done() and not waiter.cancelled():
+                self.release(None)
+            else:
+                waiter.cancel()
+                self.waiters.remove(waiter)
+            raise
+        self.admitted += 1
+
+    def release(self, service_seconds=None):
+        if service_seconds is not None:
+            if self.service_seconds is None:
+                self.service_seconds = service_seconds
+            else:
+                self.service_seconds += _SERVICE_TIME_ALPHA * (service_seconds - self.service_seconds)
+        # Hand the slot straight to the oldest waiter, if any
+        while self.waiters:
+            waiter = self.waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "routes": [f"{prefix}*{self.suffix}" if self.suffix else prefix for prefix in self.prefixes],
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "max_wait_seconds": self.max_wait,
+            "active": self.active,
+            "queued": len(self.waiters),
+            "admitted": self.admitted,
+            "rejected_queue_full": self.rejected_queue_full,
+            "rejected_wait": self.rejected_wait,
+            "avg_service_ms": round(self.service_seconds * 1000, 3) if self.service_seconds is not None else None
+        }
+
+
+# The first limit matching a path applies
+LIMITS = [
+    AdmissionLimit("resume upload", ["/upload_resume/"], ADMISSION_UPLOAD_CONCURRENCY),
+    AdmissionLimit("match stream", ["/matches/"], ADMISSION_STREAM_CONCURRENCY, suffix="/stream"),
+    AdmissionLimit("batch matching", ["/matches/batch"], ADMISSION_BATCH_CONCURRENCY),
+    AdmissionLimit("matching", ["/matches/"], ADMISSION_MATCH_CONCURRENCY),
+]
+
+
+def stats():
+    return [limit.stats() for limit in LIMITS]
+
+
+class AdmissionMiddleware:
+    """ASGI middleware applying LIMITS to matching HTTP requests."""
+
+    def __init__(self, app, limits=None):
+        self.app = app
+        self.limits = LIMITS if limits is None else limits
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "OPTIONS":
+            return await self.app(scope, receive, send)
+        limit = next((limit for limit in self.limits if limit.matches(scope["path"])), None)
+        if limit is None:
+            return await self.app(scope, receive, send)
+
+        try:
+            await limit.acquire()
+        except Rejected as rejection:
+            return await self._reject(send, rejection)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limit.release(time.perf_counter() - start)
+
+    @staticmethod
+    async def _reject(send, rejection: Rejected):
+        body = orjson.dumps({"detail": rejection.detail})
+        await send({
+            "type": "http.response.start",
+            "status": rejection.status_code,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(rejection.retry_after).encode()),
+            ]
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Multi-core batch matching.
+
+A full recompute scores every student against the whole catalog, which is
+embarrassingly parallel across students. BatchRunner copies the catalog's
+arrays into shared memory once, starts a process pool whose workers attach
+to those blocks instead of each receiving a copy, and fans student chunks
+out to the workers. Results stream back to the parent process, which is the
+only one writing Match rows, in bulk.
+
+    python batch_runner.py --workers 8 --chunk-size 1000
+"""
+
+import argparse
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from multiprocessing import shared_memory
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from sqlalchemy import insert, delete
+
+from models import Student, Match
+from base import SessionLocal
+from catalog import CatalogSnapshot, PackedStrings, load_catalog
+from matching import iter_top_match_rows, MATCH_THRESHOLD, TOP_K
+from student_features import load_student_features
+import revisions  # bump table revisions on writes
+
+DEFAULT_WORKERS = os.cpu_count() or 1
+DEFAULT_CHUNK_SIZE = 1000
+
+
+class SharedCatalog:
+    """
+    The scoring arrays of a catalog snapshot, copied into shared memory,
+    including the ones CatalogSnapshot derives from the skill counts, so
+    workers don't each recompute and hold their own copy.
+    """
+
+    def __init__(self, catalog):
+        self.blocks = []
+        self.spec = {
+            "arrays": {},
+            "shape": catalog.skills.shape,
+            "domains": catalog.domains,
+            "vocabulary": catalog.vocabulary
+        }
+        arrays = {
+            "ids": catalog.ids,
+            "min_cgpa": catalog.min_cgpa,
+            "min_year": catalog.min_year,
+            "positions": catalog.positions,
+            "domain_codes": catalog.domain_codes,
+            "skills_data": catalog.skills.data,
+            "skills_indices": catalog.skills.indices,
+            "skills_indptr": catalog.skills.indptr,
+            "skill_sq_norms": catalog.skill_sq_norms
+        }
+        # As in snapshot files: presence and squares share the count matrix's
+        # structure, so only their values are stored, and only if they differ
+        if catalog.skill_presence is not catalog.skills:
+            arrays["presence_data"] = catalog.skill_presence.data
+            arrays["squares_data"] = catalog.skill_squares.data
+        for name, array in arrays.items():
+            block = shared_memory.SharedMemory(create=True, size=max(1, array.nbytes))
+            np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+            self.blocks.append(block)
+            self.spec["arrays"][name] = (block.name, array.dtype.str, array.shape)
+
+    def close(self):
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+        self.blocks = []
+
+    @staticmethod
+    def attach(spec):
+        """Rebuild a (text-less) CatalogSnapshot on top of the shared blocks."""
+        blocks = []
+        arrays = {}
+        for name, (block_name, dtype, shape) in spec["arrays"].items():
+            # Pool workers report to the parent's resource tracker; the
+            # parent unlinks the blocks in close()
+            block = shared_memory.SharedMemory(name=block_name)
+            blocks.append(block)
+            arrays[name] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+
+        shape = tuple(spec["shape"])
+        indices, indptr = arrays["skills_indices"], arrays["skills_indptr"]
+        skills = csr_matrix((arrays["skills_data"], indices, indptr), shape=shape, copy=False)
+        if "presence_data" in arrays:
+            presence = csr_matrix((arrays["presence_data"], indices, indptr), shape=shape, copy=False)
+            squares = csr_matrix((arrays["squares_data"], indices, indptr), shape=shape, copy=False)
+        else:
+            presence = squares = skills
+        no_text = PackedStrings.from_list([])
+        catalog = CatalogSnapshot(
+            ids=arrays["ids"],
+            min_cgpa=arrays["min_cgpa"],
+            min_year=arrays["min_year"],
+            positions=arrays["positions"],
+            domain_codes=arrays["domain_codes"],
+            domains=spec["domains"],
+            skills=skills,
+            vocabulary=spec["vocabulary"],
+            titles=no_text,
+            descriptions=no_text,
+            required_skills=no_text,
+            skill_presence=presence,
+            skill_squares=squares,
+            skill_sq_norms=arrays["skill_sq_norms"]
+        )
+        return catalog, blocks
+
+
+# Per-worker state, set by _init_worker
+_worker_catalog = None
+_worker_blocks = None
+_worker_options = None
+
+
+def _init_worker(spec, threshold, top_k):
+    global _worker_catalog, _worker_blocks, _worker_options
+    _worker_catalog, _worker_blocks = SharedCatalog.attach(spec)
+    _worker_options = (threshold, top_k)
+
+
+def _score_chunk(features):
+    """Worker: top matches for a chunk, as (student_id, internship_id, score) rows."""
+    threshold, top_k = _worker_options
+    ids = _worker_catalog.ids
+    rows = []
+    for feature, indices, scores in iter_top_match_rows(features, _worker_catalog, threshold, top_k):
+        rows.extend(
+            (feature.student_id, int(ids[index]), float(score)) for index, score in zip(indices, scores)
+        )
+    return [feature.student_id for feature in features], rows
+
+
+class BatchRunner:
+    """
+    Process pool scoring student chunks against a shared-memory catalog.
+
+        with BatchRunner(catalog, workers=8) as runner:
+            for student_ids, rows in runner.map(chunks):
+                ...
+    """
+
+    def __init__(self, catalog, workers: int = DEFAULT_WORKERS,
+                 threshold: float = MATCH_THRESHOLD, top_k: int = TOP_K):
+        self.catalog = catalog
+        self.workers = max(1, workers)
+        self.threshold = threshold
+        self.top_k = top_k
+        self.shared = None
+        self.pool = None
+
+    def __enter__(self):
+        self.shared = SharedCatalog(self.catalog)
+        self.pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_worker,
+            initargs=(self.shared.spec, self.threshold, self.top_k)
+        )
+        return self
+
+    def __exit__(self, *exc_info):
+        self.pool.shutdown(wait=True, cancel_futures=True)
+        self.shared.close()
+
+    def map(self, chunks):
+        """
+        Score an iterable of StudentFeatures chunks, yielding (student_ids,
+        rows) as workers finish. At most two chunks per worker are in flight,
+        so chunks can be produced lazily from the database.
+        """
+        in_flight = deque()
+        chunks = iter(chunks)
+        exhausted = False
+        while True:
+            while not exhausted and len(in_flight) < self.workers * 2:
+                chunk = next(chunks, None)
+                if chunk is None:
+                    exhausted = True
+                else:
+                    in_flight.append(self.pool.submit(_score_chunk, chunk))
+            if not in_flight:
+                return
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                in_flight.remove(future)
+                yield future.result()
+
+
+def iter_student_chunks(db, chunk_size: int, after_id: int = 0):
+    """StudentFeatures for every active student, in id order, chunk_size at a time."""
+    while True:
+        features = load_student_features(db, Student.is_active == True, Student.id > after_id, limit=chunk_size)
+        if not features:
+            return
+        after_id = features[-1].student_id
+        yield features
+        db.expunge_all()
+
+
+def bulk_replace_matches(db, student_ids, rows):
+    """Replace the pending matches of the given students with new rows. Does not commit."""
+    db.execute(delete(Match).where(Match.student_id.in_(student_ids), Match.status == "pending"))
+    if rows:
+        db.execute(insert(Match), [
+            {"student_id": student_id, "internship_id": internship_id,
+             "match_score": score, "status": "pending"}
+            for student_id, internship_id, score in rows
+        ])
+
+
+def recompute_all_matches(workers: int = DEFAULT_WORKERS, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                          threshold: float = MATCH_THRESHOLD, top_k: int = TOP_K):
+    """Recompute the pending top matches of every active student. Returns the student count."""
+    reader = SessionLocal()
+    writer = SessionLocal()
+    processed = 0
+    try:
+        catalog = load_catalog(reader)
+        with BatchRunner(catalog, workers, threshold, top_k) as runner:
+            for student_ids, rows in runner.map(iter_student_chunks(reader, chunk_size)):
+                bulk_replace_matches(writer, student_ids, rows)
+                writer.commit()
+                processed += len(student_ids)
+        return processed
+    finally:
+        reader.close()
+        writer.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recompute matches for every student")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--threshold", type=float, default=MATCH_THRESHOLD)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    count = recompute_all_matches(args.workers, args.chunk_size, args.threshold)
+    elapsed = time.perf_counter() - start
+    print(f"Recomputed matches for {count} students in {elapsed:.1f}s "
+          f"({count / max(elapsed, 1e-9):.0f} students/s, {args.workers} workers)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+"""
+Benchmarks for the matching engine. Run from the backend directory, e.g.
+
+    python -m benchmarks.catalog_memory
+"""
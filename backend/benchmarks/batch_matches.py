@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+A cohort matched one student at a time (what hundreds of GET /matches/{id}
+calls do: score one student, commit each match) against POST /matches/batch
+(score every student in one pass, one bulk write), on a synthetic catalog and
+an in-memory database.
+
+    python -m benchmarks.batch_matches [internship_count] [student_count]
+"""
+
+import sys
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from base import Base
+from data_generator import generate_random_student
+from models import Student, Match
+from matching import score_students, top_matches, iter_top_match_rows, MATCH_THRESHOLD, TOP_K
+from student_features import StudentFeatures
+from batch_runner import bulk_replace_matches
+from benchmarks.retrieval_recall import build_catalog
+
+
+def main():
+    internships = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    students = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+
+    catalog = build_catalog(internships)
+    features = [StudentFeatures.from_student(Student(id=i, **generate_random_student()))
+                for i in range(1, students + 1)]
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+
+    db = Session()
+    start = time.perf_counter()
+    for feature in features:
+        scores = score_students([feature], catalog)[0]
+        for match in top_matches(catalog, scores, MATCH_THRESHOLD, TOP_K):
+            db.add(Match(student_id=feature.student_id, internship_id=match["internship_id"],
+                         match_score=match["match_score"]))
+            db.commit()
+    one_by_one = time.perf_counter() - start
+    db.close()
+
+    db = Session()
+    start = time.perf_counter()
+    rows = [
+        (feature.student_id, int(catalog.ids[index]), float(score))
+        for feature, indices, scores in iter_top_match_rows(features, catalog, MATCH_THRESHOLD, TOP_K)
+        for index, score in zip(indices, scores)
+    ]
+    bulk_replace_matches(db, [feature.student_id for feature in features], rows)
+    db.commit()
+    batched = time.perf_counter() - start
+    db.close()
+
+    print(f"Internships: {internships}, students: {students}, matches written: {len(rows)}")
+    print(f"One student at a time: {one_by_one:8.2f}s ({students / one_by_one:8.0f} students/s)")
+    print(f"Batch:                 {batched:8.2f}s ({students / batched:8.0f} students/s)")
+    print(f"Speedup: {one_by_one / batched:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Throughput of the multi-core BatchRunner for 1, 2, 4, ... workers up to the
+core count, on a synthetic catalog (no database writes).
+
+    python -m benchmarks.batch_speedup [internship_count] [student_count] [chunk_size]
+"""
+
+import os
+import sys
+import time
+
+from data_generator import generate_random_student
+from models import Student
+from student_features import StudentFeatures
+from batch_runner import BatchRunner
+from benchmarks.retrieval_recall import build_catalog
+
+
+def main():
+    internships = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    students = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+    chunk_size = int(sys.argv[3]) if len(sys.argv) > 3 else 250
+
+    catalog = build_catalog(internships)
+    features = [StudentFeatures.from_student(Student(id=i, **generate_random_student()))
+                for i in range(1, students + 1)]
+    chunks = [features[i:i + chunk_size] for i in range(0, len(features), chunk_size)]
+
+    worker_counts = []
+    workers = 1
+    while workers < (os.cpu_count() or 1):
+        worker_counts.append(workers)
+        workers *= 2
+    worker_counts.append(os.cpu_count() or 1)
+
+    print(f"Internships: {internships}, students: {students}, chunk size: {chunk_size}")
+    print(f"{'workers':>8}{'seconds':>10}{'students/s':>12}{'speedup':>10}")
+    baseline = None
+    for workers in worker_counts:
+        with BatchRunner(catalog, workers) as runner:
+            start = time.perf_counter()
+            for _ in runner.map(chunks):
+                pass
+            elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+        print(f"{workers:>8}{elapsed:>10.2f}{students / elapsed:>12.0f}{baseline / elapsed:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Memory and scoring time of the internship catalog snapshot versus loading
+every Internship as an ORM object, measured on an in-memory SQLite database.
+
+    python -m benchmarks.catalog_memory [internship_count]
+"""
+
+import sys
+import time
+import tracemalloc
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from base import Base
+from models import Student, Internship
+from data_generator import generate_random_internship, generate_random_student
+from catalog import load_catalog
+from matching import calculate_match_score, score_students
+from student_features import StudentFeatures
+
+
+def timed(fn):
+    """Run fn and return (result, seconds)."""
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def peak_memory(fn):
+    """Peak bytes allocated while running fn (tracemalloc slows it down, so it isn't timed)."""
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+
+    db = Session()
+    db.add_all(Internship(**generate_random_internship(1)) for _ in range(count))
+    db.commit()
+    db.close()
+
+    student = Student(id=1, **generate_random_student())
+    per_10k = 10000 / count
+
+    def load_orm():
+        db = Session()
+        try:
+            return db.query(Internship).all()
+        finally:
+            db.close()
+
+    def load_snapshot():
+        db = Session()
+        try:
+            return load_catalog(db)
+        finally:
+            db.close()
+
+    internships, orm_load = timed(load_orm)
+    orm_peak = peak_memory(load_orm)
+    _, orm_score = timed(lambda: [calculate_match_score(student, i) for i in internships])
+
+    catalog, snapshot_load = timed(load_snapshot)
+    snapshot_peak = peak_memory(load_snapshot)
+    features = [StudentFeatures.from_student(student)]
+    _, snapshot_score = timed(lambda: score_students(features, catalog))
+
+    print(f"Internships: {count}")
+    print(f"{'':24}{'ORM objects':>16}{'snapshot':>16}")
+    print(f"{'load time (s)':24}{orm_load:>16.3f}{snapshot_load:>16.3f}")
+    print(f"{'peak load memory (MB)':24}{orm_peak / 1e6:>16.2f}{snapshot_peak / 1e6:>16.2f}")
+    print(f"{'score one student (s)':24}{orm_score:>16.3f}{snapshot_score:>16.4f}")
+    print(f"Snapshot size per 10k internships: {catalog.nbytes() * per_10k / 1e6:.2f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+GET /internships/search latency on a synthetic catalog: the full-text index
+(FTS5 on SQLite) against LIKE matching of every word, for one- and two-word
+queries with and without the cgpa / year_of_study filters. Also reports how
+long backfilling the index over the existing rows takes.
+
+    python -m benchmarks.internship_search [internship_count] [repeats] [database_url]
+
+Uses an in-memory SQLite database by default; pass a PostgreSQL URL (of a
+scratch database: the tables are created and filled) to measure tsvector.
+"""
+
+import statistics
+import sys
+import time
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session
+
+import search
+from base import Base
+from data_generator import generate_random_internship
+from models import Internship
+from search import ensure_search_index, search_internships
+
+QUERIES = [
+    ("python", {}),
+    ("machine learning", {}),
+    ("react", {"cgpa": 7.0}),
+    ("data sql", {"cgpa": 8.0, "year_of_study": 2}),
+    ("dev", {"year_of_study": 1}),
+    ("kubernetes cloud", {}),
+]
+BATCH_SIZE = 10000
+
+
+def timed(repeats, function):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = function()
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times), result
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    url = sys.argv[3] if len(sys.argv) > 3 else "sqlite://"
+
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        for start in range(0, count, BATCH_SIZE):
+            conn.execute(insert(Internship), [
+                generate_random_internship(1) for _ in range(min(BATCH_SIZE, count - start))
+            ])
+
+    start = time.perf_counter()
+    ensure_search_index(engine)
+    print(f"Internships: {count}, index backfill: {time.perf_counter() - start:.2f}s")
+
+    with Session(engine) as db:
+        indexed_backend = search.search_backend(db.connection())
+        print(f"{'query':<20}{'filters':<32}{'matches':>9}{indexed_backend + ' ms':>12}{'like ms':>10}")
+        for query, filters in QUERIES:
+            search_ms, page = timed(repeats, lambda: search_internships(db, query, **filters))
+            original = search.search_backend
+            search.search_backend = lambda conn: "like"
+            try:
+                like_ms, like_page = timed(repeats, lambda: search_internships(db, query, **filters))
+            finally:
+                search.search_backend = original
+            described = ", ".join(f"{key}={value}" for key, value in filters.items())
+            print(f"{query:<20}{described:<32}{page['total']:>9}{search_ms:>12.2f}{like_ms:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
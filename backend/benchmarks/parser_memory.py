@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Memory of N API workers that parse resumes, in the three deployment modes:
+
+- independent: every worker loads the spaCy model itself (uvicorn --workers)
+- preload:     a master loads it once, gc.freeze()s and forks the workers
+               (gunicorn.conf.py)
+- sidecar:     one parser_service.py process holds the model and the workers
+               send it the text over a unix socket (RESUME_PARSER_SOCKET)
+
+Each worker parses a few synthetic resumes, so the model's pages have really
+been touched, then all workers are measured together. RSS counts shared pages
+in full in every process; PSS splits them between the processes sharing them
+and is the better measure of what N workers cost. "extra" is the preload
+master or the sidecar. Read from /proc, so Linux only.
+
+If en_core_web_sm isn't installed, an untrained pipeline with the same
+components (tok2vec, tagger, parser, ner) stands in for it; set
+RESUME_PARSER_MODEL to measure another pipeline.
+
+    python -m benchmarks.parser_memory [max_workers] [resumes_per_worker]
+"""
+
+import gc
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+
+MODES = ("independent", "preload", "sidecar")
+
+
+def memory_kib(pid) -> tuple:
+    """(RSS, PSS) of a process in KiB."""
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            name, _, rest = line.partition(":")
+            if name in ("Rss", "Pss"):
+                values[name] = int(rest.split()[0])
+    return values["Rss"], values["Pss"]
+
+
+def save_stand_in_pipeline(path):
+    import spacy
+    from spacy.training import Example
+
+    nlp = spacy.blank("en")
+    for name in ("tok2vec", "tagger", "parser", "ner"):
+        nlp.add_pipe(name)
+    doc = nlp.make_doc("Jane Doe studies Computer Science at MIT")
+    example = Example.from_dict(doc, {
+        "tags": ["NNP", "NNP", "VBZ", "NNP", "NNP", "IN", "NNP"],
+        "heads": [1, 2, 2, 4, 2, 2, 5],
+        "deps": ["compound", "nsubj", "ROOT", "compound", "dobj", "prep", "pobj"],
+        "entities": ["B-PERSON", "L-PERSON", "O", "O", "O", "O", "U-ORG"]
+    })
+    nlp.initialize(lambda: [example])
+    nlp.to_disk(path)
+
+
+def parse_and_wait(ready, done, resumes):
+    from benchmarks.resume_parse import generate_resume
+    import resume_parser
+
+    rng = random.Random(os.getpid())
+    for _ in range(resumes):
+        resume_parser.parse_resume(generate_resume(200, rng))
+    ready.release()
+    done.wait()
+
+
+def forked_worker(ready, done, resumes):
+    gc.enable()
+    parse_and_wait(ready, done, resumes)
+
+
+def preload_master(workers, ready, done, pids, resumes):
+    # What gunicorn.conf.py does: load everything with the GC off, freeze, fork
+    gc.disable()
+    import resume_parser  # loads the model, once, before the fork
+    import benchmarks.resume_parse  # generate_resume, imported before the fork too
+    gc.freeze()
+    context = multiprocessing.get_context("fork")
+    children = [context.Process(target=forked_worker, args=(ready, done, resumes)) for _ in range(workers)]
+    for child in children:
+        child.start()
+    pids.put([child.pid for child in children])
+    for child in children:
+        child.join()
+
+
+def run(mode, workers, resumes, socket_path):
+    """Start the workers (and extra process) for a mode; return (worker pids, extra pid, stop)."""
+    context = multiprocessing.get_context("spawn")
+    ready, done = context.Semaphore(0), context.Event()
+    processes = []
+    extra = None
+
+    if mode == "preload":
+        pids = context.Queue()
+        extra = context.Process(target=preload_master, args=(workers, ready, done, pids, resumes))
+        extra.start()
+        worker_pids = pids.get()
+    else:
+        if mode == "sidecar":
+            from parser_service import serve
+            started = context.Event()
+            extra = context.Process(target=serve, args=(socket_path, started), daemon=True)
+            extra.start()
+            started.wait()
+            os.environ["RESUME_PARSER_SOCKET"] = socket_path
+        try:
+            processes = [context.Process(target=parse_and_wait, args=(ready, done, resumes))
+                         for _ in range(workers)]
+            for process in processes:
+                process.start()
+        finally:
+            os.environ.pop("RESUME_PARSER_SOCKET", None)
+        worker_pids = [process.pid for process in processes]
+
+    for _ in range(workers):
+        ready.acquire()
+
+    def stop():
+        done.set()
+        for process in processes:
+            process.join()
+        if mode == "preload":
+            extra.join()
+        elif mode == "sidecar":
+            extra.terminate()
+            extra.join()
+
+    return worker_pids, extra.pid if extra is not None else None, stop
+
+
+def main():
+    max_workers = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    resumes = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    with tempfile.TemporaryDirectory() as directory:
+        model = os.environ.get("RESUME_PARSER_MODEL", "en_core_web_sm")
+        try:
+            import spacy
+            spacy.load(model)
+        except OSError:
+            model = os.path.join(directory, "stand-in")
+            save_stand_in_pipeline(model)
+            os.environ["RESUME_PARSER_MODEL"] = model
+            print("en_core_web_sm not installed: using an untrained tok2vec/tagger/parser/ner pipeline")
+        print(f"Model: {model}, {resumes} resumes parsed per worker; memory in MiB")
+        print(f"{'mode':>12}{'workers':>9}{'RSS/worker':>12}{'PSS/worker':>12}{'extra PSS':>11}{'total PSS':>11}")
+
+        workers = 1
+        while workers <= max_workers:
+            for mode in MODES:
+                socket_path = os.path.join(directory, "parser.sock")
+                worker_pids, extra_pid, stop = run(mode, workers, resumes, socket_path)
+                try:
+                    measured = [memory_kib(pid) for pid in worker_pids]
+                    extra_pss = memory_kib(extra_pid)[1] if extra_pid else 0
+                finally:
+                    stop()
+                rss = sum(rss for rss, _ in measured) / workers / 1024
+                pss = sum(pss for _, pss in measured) / workers / 1024
+                total = (sum(pss for _, pss in measured) + extra_pss) / 1024
+                print(f"{mode:>12}{workers:>9}{rss:>12.1f}{pss:>12.1f}{extra_pss / 1024:>11.1f}{total:>11.1f}")
+            workers *= 2
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Recall@k and query latency of MinHash LSH candidate retrieval against exact
+scoring of the whole catalog, on a synthetic catalog.
+
+    python -m benchmarks.retrieval_recall [internship_count] [query_count]
+"""
+
+import sys
+import time
+
+import numpy as np
+
+from data_generator import generate_random_internship, generate_random_student
+from models import Student
+from catalog import CatalogSnapshot
+from matching import score_students, top_match_indices
+from student_features import StudentFeatures
+from retrieval import MinHashIndex, ANN_CANDIDATES
+
+
+def build_catalog(count):
+    rows = []
+    for internship_id in range(1, count + 1):
+        data = generate_random_internship(1)
+        rows.append((internship_id, data["title"], data["description"], data["required_skills"],
+                     data["min_cgpa"], data["min_year"], data["positions_available"], data["domain"]))
+    return CatalogSnapshot.from_rows(rows)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    queries = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    ks = (3, 10)
+
+    catalog = build_catalog(count)
+    start = time.perf_counter()
+    index = MinHashIndex(catalog)
+    build_time = time.perf_counter() - start
+
+    exact_times, approx_times = [], []
+    hits = {k: 0 for k in ks}
+    totals = {k: 0 for k in ks}
+    for student_id in range(1, queries + 1):
+        features = [StudentFeatures.from_student(Student(id=student_id, **generate_random_student()))]
+
+        start = time.perf_counter()
+        exact = score_students(features, catalog)[0]
+        exact_times.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        candidates = index.query(list(features[0].skill_counts))
+        approx = score_students(features, catalog.take(candidates))[0]
+        approx_times.append(time.perf_counter() - start)
+
+        for k in ks:
+            expected = set(top_match_indices(exact, 0.0, k).tolist())
+            found = set(candidates[top_match_indices(approx, 0.0, k)].tolist())
+            hits[k] += len(expected & found)
+            totals[k] += len(expected)
+
+    print(f"Internships: {count}, queries: {queries}, candidates per query: {ANN_CANDIDATES}")
+    print(f"Index build time: {build_time:.2f}s")
+    print(f"Exact scoring latency  p50 {np.median(exact_times) * 1000:8.2f} ms")
+    print(f"LSH + rerank latency   p50 {np.median(approx_times) * 1000:8.2f} ms")
+    for k in ks:
+        print(f"Recall@{k}: {hits[k] / totals[k]:.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Serialization time per 10k rows: ORM instances through jsonable_encoder and
+json.dumps (what the admin endpoints used to do) versus column tuples turned
+into dicts and rendered with orjson. Also compares validating match dicts
+through MatchResponse with rendering them directly.
+
+    python -m benchmarks.serialization [row_count]
+"""
+
+import json
+import sys
+import time
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel
+from typing import List
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from base import Base
+from models import Student
+from data_generator import generate_random_student
+from serialization import STUDENT_COLUMNS, list_rows
+
+
+# Same fields as main.MatchResponse (importing main would create tables in ./internship.db)
+class MatchResponse(BaseModel):
+    internship_id: int
+    title: str
+    description: str
+    required_skills: List[str]
+    domain: str
+    match_score: float
+
+
+def best_of(fn, repeat=3):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+
+    db = Session()
+    students = []
+    for i in range(count):
+        data = generate_random_student()
+        data["email"] = f"{i}.{data['email']}"
+        students.append(Student(**data))
+    db.add_all(students)
+    db.commit()
+    db.close()
+
+    def orm_path():
+        db = Session()
+        try:
+            return json.dumps(jsonable_encoder(db.query(Student).all())).encode("utf-8")
+        finally:
+            db.close()
+
+    def tuple_path():
+        db = Session()
+        try:
+            return orjson.dumps(list_rows(db, STUDENT_COLUMNS, Student.id))
+        finally:
+            db.close()
+
+    matches = [{
+        "internship_id": i, "title": "Data Science Intern", "description": "Work on exciting projects",
+        "required_skills": ["Python", "SQL", "Pandas"], "domain": "Data Science", "match_score": 0.73
+    } for i in range(count)]
+
+    def validated_matches():
+        return json.dumps(jsonable_encoder([MatchResponse(**m) for m in matches])).encode("utf-8")
+
+    def direct_matches():
+        return orjson.dumps(matches)
+
+    per_10k = 10000 / count
+    results = [
+        ("admin students: ORM + jsonable_encoder", best_of(orm_path)),
+        ("admin students: tuples + orjson", best_of(tuple_path)),
+        ("matches: MatchResponse + jsonable_encoder", best_of(validated_matches)),
+        ("matches: dicts + orjson", best_of(direct_matches)),
+    ]
+    print(f"Rows: {count} (times scaled to 10k rows)")
+    for name, seconds in results:
+        print(f"{name:45}{seconds * per_10k * 1000:10.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
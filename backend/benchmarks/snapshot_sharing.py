@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Catalog memory across worker processes: each worker building a private
+snapshot (what every uvicorn worker did before snapshot files) against every
+worker mapping the same snapshot file. Reports per-worker startup time and
+the catalog's share of memory summed over the workers, as PSS (proportional
+set size: shared pages are split between the processes mapping them), read
+from /proc/self/smaps_rollup, so Linux only.
+
+    python -m benchmarks.snapshot_sharing [internship_count] [max_workers]
+"""
+
+import multiprocessing
+import os
+import pickle
+import sys
+import tempfile
+import time
+
+from benchmarks.retrieval_recall import build_catalog
+from snapshot_store import publish_snapshot, open_snapshot
+from matching import score_students
+from student_features import StudentFeatures
+from models import Student
+from data_generator import generate_random_student
+
+
+def pss_kib() -> int:
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            if line.startswith("Pss:"):
+                return int(line.split()[1])
+    raise RuntimeError("no Pss in smaps_rollup")
+
+
+def worker(mode, source, ready, done, results):
+    before = pss_kib()
+    start = time.perf_counter()
+    if mode == "private":
+        # Unpickling stands in for the DB scan: same private arrays, less noise
+        with open(source, "rb") as f:
+            catalog = pickle.load(f)
+    else:
+        catalog = open_snapshot(source)
+    # Score once so every page of the scoring arrays is actually touched
+    student = StudentFeatures.from_student(Student(id=1, **generate_random_student()))
+    score_students([student], catalog)
+    startup = time.perf_counter() - start
+    ready.release()
+    # Hold on until every worker is loaded, so shared pages are split N ways
+    done.wait()
+    results.put((startup, pss_kib() - before))
+
+
+def run(mode, source, workers):
+    context = multiprocessing.get_context("spawn")
+    ready, done, results = context.Semaphore(0), context.Event(), context.Queue()
+    processes = [context.Process(target=worker, args=(mode, source, ready, done, results))
+                 for _ in range(workers)]
+    for process in processes:
+        process.start()
+    for _ in processes:
+        ready.acquire()
+    done.set()
+    measured = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    startup = sum(startup for startup, _ in measured) / workers
+    return startup, sum(pss for _, pss in measured)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    max_workers = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+
+    catalog = build_catalog(count)
+    with tempfile.TemporaryDirectory() as directory:
+        path = publish_snapshot(catalog, 1, directory)
+        pickled = os.path.join(directory, "catalog.pickle")
+        with open(pickled, "wb") as f:
+            pickle.dump(catalog, f)
+
+        print(f"Internships: {count}, snapshot file: {os.path.getsize(path) / 1024:.0f} KiB, "
+              f"in-memory snapshot: {catalog.nbytes() / 1024:.0f} KiB")
+        print(f"{'workers':>8}{'private startup ms':>20}{'private PSS KiB':>17}"
+              f"{'mapped startup ms':>19}{'mapped PSS KiB':>16}")
+        workers = 1
+        while workers <= max_workers:
+            private_startup, private_pss = run("private", pickled, workers)
+            mapped_startup, mapped_pss = run("mapped", path, workers)
+            print(f"{workers:>8}{private_startup * 1000:>20.1f}{private_pss:>17}"
+                  f"{mapped_startup * 1000:>19.1f}{mapped_pss:>16}")
+            workers *= 2
+
+
+if __name__ == "__main__":
+    main()
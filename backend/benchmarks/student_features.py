@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+CPU spent getting a student's scoring features: loading the Student through
+the ORM and deriving them (StudentFeatures.from_student) against reading the
+stored record (load_student_features), for a single student, as in
+GET /matches/{id} and a student sweep, and for chunks of active students,
+as in POST /matches/batch, recompute jobs and internship sweeps. The single
+student case is also shown with the scoring that follows it, against a
+synthetic catalog, to put it in proportion to a whole match request.
+
+    python -m benchmarks.student_features [student_count] [internship_count] [repeats]
+
+Times are process CPU time, on an in-memory SQLite database.
+"""
+
+import random
+import statistics
+import sys
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.pool import StaticPool
+
+from base import Base, SessionLocal
+from data_generator import generate_random_student
+from models import Student
+from matching import score_students, top_matches
+from student_features import StudentFeatures, load_features, load_student_features
+from benchmarks.retrieval_recall import build_catalog
+
+CHUNK_SIZE = 1000
+
+
+def derived_one(db, student_id):
+    student = db.query(Student).filter(Student.id == student_id).first()
+    return [StudentFeatures.from_student(student)]
+
+
+def stored_one(db, student_id):
+    return [load_features(db, student_id)]
+
+
+def derived_chunk(db, after_id):
+    students = (
+        db.query(Student)
+        .filter(Student.is_active == True, Student.id > after_id)
+        .order_by(Student.id)
+        .limit(CHUNK_SIZE)
+        .all()
+    )
+    return [StudentFeatures.from_student(student) for student in students]
+
+
+def stored_chunk(db, after_id):
+    return load_student_features(db, Student.is_active == True, Student.id > after_id, limit=CHUNK_SIZE)
+
+
+def cpu_ms(engine, repeats, keys, load, catalog=None):
+    """Median CPU milliseconds of one request: a fresh session, the features, optionally scoring."""
+    times = []
+    for _ in range(repeats):
+        for key in keys:
+            start = time.process_time()
+            with SessionLocal(bind=engine) as db:
+                features = load(db, key)
+            if catalog is not None:
+                top_matches(catalog, score_students(features, catalog)[0])
+            times.append((time.process_time() - start) * 1000)
+    return statistics.median(times)
+
+
+def main():
+    student_count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    internship_count = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    repeats = int(sys.argv[3]) if len(sys.argv) > 3 else 3
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal(bind=engine) as db:
+        # Added through the ORM, so the flush hook stores every record
+        db.add_all(
+            Student(**{**generate_random_student(), "email": f"student{i}@example.com"})
+            for i in range(student_count)
+        )
+        db.commit()
+
+    rng = random.Random(1)
+    student_ids = rng.sample(range(1, student_count + 1), min(500, student_count))
+    chunk_starts = list(range(0, student_count, CHUNK_SIZE))
+    catalog = build_catalog(internship_count)
+
+    print(f"Students: {student_count}, catalog: {internship_count}; median CPU ms per operation")
+    print(f"{'operation':<36}{'derived':>10}{'stored':>10}{'saved':>8}")
+    cases = [
+        ("one student", student_ids, derived_one, stored_one, None),
+        (f"one student + scoring ({internship_count})", student_ids, derived_one, stored_one, catalog),
+        (f"chunk of {CHUNK_SIZE} students", chunk_starts, derived_chunk, stored_chunk, None),
+    ]
+    for name, keys, derived, stored, scored_catalog in cases:
+        derived_ms = cpu_ms(engine, repeats, keys, derived, scored_catalog)
+        stored_ms = cpu_ms(engine, repeats, keys, stored, scored_catalog)
+        saved = 1 - stored_ms / derived_ms
+        print(f"{name:<36}{derived_ms:>10.3f}{stored_ms:>10.3f}{saved:>8.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,329 @@
+"""
+Compact, array-backed snapshot of the active internship catalog.
+
+Matching only needs a handful of fields per internship, so instead of loading
+every Internship as an ORM object per request we keep a read-only snapshot:
+numeric attributes as NumPy arrays, domains as integer codes, required skills
+as a CSR matrix of token counts, and the text fields packed into UTF-8 buffers
+that are only decoded when a response is built.
+
+The snapshot is rebuilt lazily after any committed write to the internships
+table and swapped in atomically, so readers always see a complete snapshot.
+With CATALOG_SNAPSHOT_DIR set (the default), the snapshot is instead mapped
+from a file shared by every worker process; see snapshot_store.py.
+"""
+
+import copy
+import json
+import math
+import os
+import threading
+import time
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sqlalchemy import event
+
+from models import Internship
+from base import SessionLocal
+from revisions import table_revision
+
+# Directory of the shared snapshot files; empty to build a private snapshot
+# in each process instead
+CATALOG_SNAPSHOT_DIR = os.environ.get("CATALOG_SNAPSHOT_DIR", "snapshots")
+# How often a worker checks whether another process changed the catalog
+CATALOG_SNAPSHOT_CHECK_SECONDS = float(os.environ.get("CATALOG_SNAPSHOT_CHECK_SECONDS", "1"))
+
+# Same tokenizer calculate_match_score gets from TfidfVectorizer
+analyze_skills = TfidfVectorizer().build_analyzer()
+
+
+class PackedStrings:
+    """
+    Immutable sequence of strings stored as one UTF-8 buffer plus offsets.
+    Much smaller than a list of str, and decoded only on access.
+    """
+
+    def __init__(self, buffer: bytes, offsets: np.ndarray):
+        self.buffer = buffer
+        self.offsets = offsets
+
+    @classmethod
+    def from_list(cls, values):
+        encoded = [(value or "").encode("utf-8") for value in values]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(value) for value in encoded], out=offsets[1:])
+        return cls(b"".join(encoded), offsets)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        start, end = self.offsets[index], self.offsets[index + 1]
+        return bytes(self.buffer[start:end]).decode("utf-8")
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    @property
+    def nbytes(self):
+        return len(self.buffer) + self.offsets.nbytes
+
+
+class CatalogSnapshot:
+    """Column-oriented view of the active internships, ordered by id."""
+
+    def __init__(self, ids, min_cgpa, min_year, positions, domain_codes, domains,
+                 skills, vocabulary, titles, descriptions, required_skills,
+                 skill_presence=None, skill_squares=None, skill_sq_norms=None):
+        self.ids = ids
+        self.min_cgpa = min_cgpa
+        self.min_year = min_year
+        self.positions = positions
+        self.domain_codes = domain_codes
+        self.domains = domains
+        self.skills = skills  # CSR, one row per internship, one column per token
+        self.vocabulary = vocabulary
+        self.titles = titles
+        self.descriptions = descriptions
+        self.required_skills = required_skills  # JSON-encoded list per row
+        self.version = None  # Internships revision the snapshot was built at, when known
+
+        self.token_index = {token: i for i, token in enumerate(vocabulary)}
+        if skill_presence is not None:
+            # Precomputed (snapshot_store maps them from the snapshot file)
+            self.skill_presence = skill_presence
+            self.skill_squares = skill_squares
+            self.skill_sq_norms = skill_sq_norms
+            return
+        # Token presence and squared counts share the sparsity structure of
+        # the count matrix. Most postings list a token once, in which case
+        # all three are the same matrix and nothing needs to be copied.
+        data, indices, indptr = skills.data, skills.indices, skills.indptr
+        if np.all(data == 1):
+            self.skill_presence = skills
+            self.skill_squares = skills
+        else:
+            self.skill_presence = csr_matrix((np.ones_like(data), indices, indptr), shape=skills.shape)
+            self.skill_squares = csr_matrix((data * data, indices, indptr), shape=skills.shape)
+        self.skill_sq_norms = np.asarray(self.skill_squares.sum(axis=1)).ravel()
+
+    @classmethod
+    def from_rows(cls, rows):
+        """
+        Build a snapshot from (id, title, description, required_skills,
+        min_cgpa, min_year, positions_available, domain) tuples.
+        """
+        rows = sorted(rows, key=lambda row: row[0])
+        domains = []
+        domain_index = {}
+        token_index = {}
+        domain_codes = np.empty(len(rows), dtype=np.int32)
+        indptr = [0]
+        indices = []
+        counts = []
+
+        for i, row in enumerate(rows):
+            domain = row[7] or ""
+            if domain not in domain_index:
+                domain_index[domain] = len(domains)
+                domains.append(domain)
+            domain_codes[i] = domain_index[domain]
+
+            row_counts = {}
+            for token in analyze_skills(" ".join(row[3] or [])):
+                column = token_index.setdefault(token, len(token_index))
+                row_counts[column] = row_counts.get(column, 0) + 1
+            for column in sorted(row_counts):
+                indices.append(column)
+                counts.append(row_counts[column])
+            indptr.append(len(indices))
+
+        skills = csr_matrix(
+            (np.asarray(counts, dtype=np.float64),
+             np.asarray(indices, dtype=np.int32),
+             np.asarray(indptr, dtype=np.int64)),
+            shape=(len(rows), len(token_index))
+        )
+
+        return cls(
+            ids=np.asarray([row[0] for row in rows], dtype=np.int64),
+            min_cgpa=np.asarray([np.nan if row[4] is None else row[4] for row in rows], dtype=np.float64),
+            min_year=np.asarray([row[5] or 0 for row in rows], dtype=np.int32),
+            positions=np.asarray([row[6] or 0 for row in rows], dtype=np.int32),
+            domain_codes=domain_codes,
+            domains=domains,
+            skills=skills,
+            vocabulary=list(token_index),
+            titles=PackedStrings.from_list([row[1] for row in rows]),
+            descriptions=PackedStrings.from_list([row[2] for row in rows]),
+            required_skills=PackedStrings.from_list([json.dumps(row[3] or []) for row in rows])
+        )
+
+    def __len__(self):
+        return len(self.ids)
+
+    def take(self, rows) -> "CatalogSnapshot":
+        """Sub-snapshot holding only the given rows (in the order given)."""
+        rows = np.asarray(rows, dtype=np.int64)
+        return CatalogSnapshot(
+            ids=self.ids[rows],
+            min_cgpa=self.min_cgpa[rows],
+            min_year=self.min_year[rows],
+            positions=self.positions[rows],
+            domain_codes=self.domain_codes[rows],
+            domains=self.domains,
+            skills=self.skills[rows],
+            vocabulary=self.vocabulary,
+            titles=PackedStrings.from_list([self.titles[row] for row in rows]),
+            descriptions=PackedStrings.from_list([self.descriptions[row] for row in rows]),
+            required_skills=PackedStrings.from_list([self.required_skills[row] for row in rows])
+        )
+
+    def row_range(self, start: int, stop: int) -> "CatalogSnapshot":
+        """
+        Rows start:stop as a view sharing this snapshot's arrays, text
+        buffers and vocabulary (only the CSR rows are copied). Unlike take(),
+        cheap enough to call per chunk while scoring.
+        """
+        view = copy.copy(self)
+        for name in ("ids", "min_cgpa", "min_year", "positions", "domain_codes", "skill_sq_norms"):
+            setattr(view, name, getattr(self, name)[start:stop])
+        view.skills = self.skills[start:stop]
+        if self.skill_presence is self.skills:
+            view.skill_presence = view.skill_squares = view.skills
+        else:
+            view.skill_presence = self.skill_presence[start:stop]
+            view.skill_squares = self.skill_squares[start:stop]
+        # Offsets index into the whole buffer, so a slice of them is enough
+        for name in ("titles", "descriptions", "required_skills"):
+            packed = getattr(self, name)
+            setattr(view, name, PackedStrings(packed.buffer, packed.offsets[start:stop + 1]))
+        return view
+
+    def row_of(self, internship_id: int):
+        """Row index of an internship id, or None if it isn't in the snapshot."""
+        row = int(np.searchsorted(self.ids, internship_id))
+        if row < len(self.ids) and self.ids[row] == internship_id:
+            return row
+        return None
+
+    def record(self, index: int) -> dict:
+        """Response fields for the internship at the given row."""
+        return {
+            "internship_id": int(self.ids[index]),
+            "title": self.titles[index],
+            "description": self.descriptions[index],
+            "required_skills": json.loads(self.required_skills[index]),
+            "domain": self.domains[self.domain_codes[index]]
+        }
+
+    def nbytes(self) -> int:
+        """Approximate memory held by the snapshot's columns."""
+        arrays = (self.ids, self.min_cgpa, self.min_year, self.positions, self.domain_codes,
+                  self.skill_sq_norms)
+        matrices = {id(m): m for m in (self.skills, self.skill_presence, self.skill_squares)}
+        return (
+            sum(array.nbytes for array in arrays)
+            + sum(m.data.nbytes + m.indices.nbytes + m.indptr.nbytes for m in matrices.values())
+            + self.titles.nbytes + self.descriptions.nbytes + self.required_skills.nbytes
+        )
+
+
+CATALOG_COLUMNS = (
+    Internship.id, Internship.title, Internship.description, Internship.required_skills,
+    Internship.min_cgpa, Internship.min_year, Internship.positions_available, Internship.domain
+)
+
+
+def load_catalog(db) -> CatalogSnapshot:
+    """Build a snapshot of the active internships straight from column tuples."""
+    rows = db.query(*CATALOG_COLUMNS).filter(Internship.is_active == True).all()
+    return CatalogSnapshot.from_rows(rows)
+
+
+_catalog = None
+_catalog_generation = 0
+_catalog_built_generation = -1
+_catalog_lock = threading.Lock()
+_next_snapshot_check = math.inf
+
+
+def _is_current(min_version) -> bool:
+    if _catalog is None or _catalog_built_generation != _catalog_generation:
+        return False
+    if min_version is not None and (_catalog.version is None or _catalog.version < min_version):
+        # Another process wrote internships since this snapshot was taken
+        return False
+    return True
+
+
+def get_catalog(min_version=None) -> CatalogSnapshot:
+    """
+    Return the current snapshot, rebuilding it first if the catalog changed.
+    With min_version (an internships revision the caller has already read,
+    e.g. for an ETag), never return a snapshot older than that revision,
+    even between periodic snapshot checks.
+    """
+    global _catalog, _catalog_built_generation, _next_snapshot_check
+    if _is_current(min_version) and time.monotonic() < _next_snapshot_check:
+        return _catalog
+
+    with _catalog_lock:
+        generation = _catalog_generation
+        if CATALOG_SNAPSHOT_DIR:
+            # Imported here because snapshot_store builds on this module
+            from snapshot_store import current_snapshot
+            _catalog = current_snapshot(_catalog)
+            _catalog_built_generation = generation
+            _next_snapshot_check = time.monotonic() + CATALOG_SNAPSHOT_CHECK_SECONDS
+        elif not _is_current(min_version):
+            db = SessionLocal()
+            try:
+                # Read in the same transaction as the rows, so it is their revision
+                revision = table_revision(db, "internships")
+                snapshot = load_catalog(db)
+            finally:
+                db.close()
+            snapshot.version = revision
+            _catalog = snapshot
+            _catalog_built_generation = generation
+        return _catalog
+
+
+def invalidate_catalog():
+    """Mark the snapshot stale; the next get_catalog() call rebuilds it."""
+    global _catalog_generation
+    _catalog_generation += 1
+
+
+# Invalidate on every committed write that touches the internships table,
+# whether it comes from the unit of work or from a bulk query update/delete.
+
+@event.listens_for(SessionLocal, "after_flush")
+def _track_internship_flush(session, flush_context):
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, Internship):
+            session.info["catalog_changed"] = True
+            return
+
+
+@event.listens_for(SessionLocal, "do_orm_execute")
+def _track_internship_bulk_write(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        table = getattr(orm_execute_state.statement, "table", None)
+        if table is not None and table.name == Internship.__tablename__:
+            orm_execute_state.session.info["catalog_changed"] = True
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _invalidate_after_commit(session):
+    if session.info.pop("catalog_changed", False):
+        invalidate_catalog()
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _discard_after_rollback(session):
+    session.info.pop("catalog_changed", None)
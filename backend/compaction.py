@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Match table retention: orphan purge, deduplication and archival.
+
+Compaction walks the matches table in three phases, each in bounded batches
+that commit on their own, so no transaction holds the write lock for long:
+
+- orphans: delete matches whose student or internship no longer exists;
+- dedupe:  keep only the newest pending row per (student, internship);
+- archive: move accepted/rejected rows older than MATCH_ARCHIVE_DAYS into
+           match_archive as zlib-compressed JSON. Allocated rows stay, since
+           allocation counts them to find allocated students and filled
+           positions.
+
+Progress is a (phase, after_id) checkpoint, so the "compact" background job
+resumes an interrupted run where it stopped. It can also be run directly:
+
+    python compaction.py --batch-size 1000
+"""
+
+import argparse
+import json
+import os
+import zlib
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, delete, insert, exists, or_
+from sqlalchemy.orm import aliased
+
+from models import Student, Internship, Match, MatchArchive
+from base import SessionLocal
+import revisions  # bump table revisions on writes
+
+COMPACTION_BATCH_SIZE = int(os.environ.get("COMPACTION_BATCH_SIZE", "1000"))
+MATCH_ARCHIVE_DAYS = int(os.environ.get("MATCH_ARCHIVE_DAYS", "90"))
+
+PHASES = ("orphans", "dedupe", "archive")
+ARCHIVED_STATUSES = ("accepted", "rejected")
+ARCHIVE_COLUMNS = (
+    Match.id, Match.student_id, Match.internship_id, Match.match_score, Match.status, Match.created_at
+)
+
+
+class MatchCompactor:
+    """
+    Runs compaction one batch at a time. step() processes the next batch
+    after the given checkpoint and returns (rows scanned, next checkpoint);
+    the next checkpoint is None once every phase is done. Nothing commits
+    here: the caller commits each batch together with its checkpoint.
+    """
+
+    def __init__(self, db, batch_size: int = COMPACTION_BATCH_SIZE, archive_days: int = MATCH_ARCHIVE_DAYS):
+        self.db = db
+        self.batch_size = max(1, batch_size)
+        self.cutoff = datetime.utcnow() - timedelta(days=archive_days)
+        self.stats = {"orphans_deleted": 0, "duplicates_deleted": 0, "archived": 0}
+
+    def step(self, checkpoint=None):
+        checkpoint = checkpoint or {"phase": PHASES[0], "after_id": 0}
+        phase, after_id = checkpoint["phase"], checkpoint["after_id"]
+        scanned, last_id = getattr(self, f"_{phase}")(after_id)
+        if scanned:
+            return scanned, {"phase": phase, "after_id": last_id}
+
+        following = PHASES.index(phase) + 1
+        if following == len(PHASES):
+            return 0, None
+        return 0, {"phase": PHASES[following], "after_id": 0}
+
+    def _match_window(self, after_id: int):
+        """Ids of the next batch_size matches: the unit of work for id-keyed phases."""
+        return self.db.execute(
+            select(Match.id).where(Match.id > after_id).order_by(Match.id).limit(self.batch_size)
+        ).scalars().all()
+
+    def _orphans(self, after_id: int):
+        window = self._match_window(after_id)
+        if not window:
+            return 0, after_id
+        orphaned = or_(
+            ~exists().where(Student.id == Match.student_id),
+            ~exists().where(Internship.id == Match.internship_id)
+        )
+        result = self.db.execute(
+            delete(Match).where(Match.id >= window[0], Match.id <= window[-1], orphaned)
+        )
+        self.stats["orphans_deleted"] += result.rowcount
+        return len(window), window[-1]
+
+    def _dedupe(self, after_id: int):
+        window = self._match_window(after_id)
+        if not window:
+            return 0, after_id
+        # A pending row is a duplicate if a newer pending row has the same
+        # pair; wherever that newer row is, it isn't deleted with this one.
+        # One index probe per row in the window, at most batch_size deletes.
+        # status || '' keeps the planner from walking every pending row
+        # through the status index instead of the id range.
+        newer = aliased(Match)
+        duplicates = self.db.execute(
+            select(Match.id).where(
+                Match.id >= window[0], Match.id <= window[-1], Match.status.concat("") == "pending",
+                exists().where(
+                    newer.student_id == Match.student_id, newer.status == "pending",
+                    newer.internship_id == Match.internship_id, newer.id > Match.id
+                )
+            )
+        ).scalars().all()
+        if duplicates:
+            self.db.execute(delete(Match).where(Match.id.in_(duplicates)))
+            self.stats["duplicates_deleted"] += len(duplicates)
+        return len(window), window[-1]
+
+    def _archive(self, after_id: int):
+        window = self._match_window(after_id)
+        if not window:
+            return 0, after_id
+        # Rows from before created_at existed have no age; they are the oldest
+        rows = self.db.execute(
+            select(*ARCHIVE_COLUMNS)
+            .where(
+                Match.id >= window[0], Match.id <= window[-1], Match.status.in_(ARCHIVED_STATUSES),
+                or_(Match.created_at < self.cutoff, Match.created_at.is_(None))
+            )
+            .order_by(Match.id)
+        ).all()
+        if rows:
+            payload = [
+                [id_, student_id, internship_id, score, status, created_at.isoformat() if created_at else None]
+                for id_, student_id, internship_id, score, status, created_at in rows
+            ]
+            self.db.execute(insert(MatchArchive).values(
+                first_match_id=rows[0].id,
+                last_match_id=rows[-1].id,
+                row_count=len(rows),
+                payload=zlib.compress(json.dumps(payload).encode("utf-8")),
+                archived_at=datetime.utcnow()
+            ))
+            self.db.execute(delete(Match).where(Match.id.in_([row.id for row in rows])))
+            self.stats["archived"] += len(rows)
+        return len(window), window[-1]
+
+
+def archived_matches(archive: MatchArchive):
+    """Decompress an archive batch back into match dicts."""
+    keys = [column.key for column in ARCHIVE_COLUMNS]
+    return [dict(zip(keys, row)) for row in json.loads(zlib.decompress(archive.payload))]
+
+
+def compact_matches(batch_size: int = COMPACTION_BATCH_SIZE, archive_days: int = MATCH_ARCHIVE_DAYS):
+    """Run every phase to completion, committing after each batch. Returns the stats."""
+    db = SessionLocal()
+    try:
+        compactor = MatchCompactor(db, batch_size, archive_days)
+        checkpoint = None
+        while True:
+            _, checkpoint = compactor.step(checkpoint)
+            db.commit()
+            if checkpoint is None:
+                return compactor.stats
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Purge, deduplicate and archive matches")
+    parser.add_argument("--batch-size", type=int, default=COMPACTION_BATCH_SIZE)
+    parser.add_argument("--archive-days", type=int, default=MATCH_ARCHIVE_DAYS)
+    args = parser.parse_args()
+
+    from base import Base, engine
+    from migrations import upgrade
+    Base.metadata.create_all(bind=engine)
+    upgrade(engine)
+
+    stats = compact_matches(args.batch_size, args.archive_days)
+    print(", ".join(f"{key}: {value}" for key, value in stats.items()))
+
+
+if __name__ == "__main__":
+    main()
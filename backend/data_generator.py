@@ -8,6 +8,8 @@ import random
 import faker
 from models import Student, Internship, Employer
 from base import SessionLocal, engine
+import revisions  # bump table revisions on writes
+import student_features  # store scoring features of written students
 
 # Initialize Faker for generating realistic fake data
 fake = faker.Faker()
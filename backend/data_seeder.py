@@ -7,6 +7,8 @@ Use this script to add existing student and internship data to the database.
 import json
 from models import Student, Internship, Employer
 from base import SessionLocal, engine
+import revisions  # bump table revisions on writes
+import student_features  # store scoring features of written students
 from sqlalchemy.orm import sessionmaker
 
 # Sample data - replace with your actual data
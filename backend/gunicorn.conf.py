@@ -0,0 +1,44 @@
+"""
+Gunicorn settings for running several API workers with one shared copy of
+the spaCy model.
+
+    gunicorn main:app -c gunicorn.conf.py
+
+The app (and with it resume_parser's model) is imported once in the master
+before the workers are forked, so the workers start out sharing the model's
+pages copy-on-write. CPython's reference counting and cyclic GC write to
+every object they visit, which would copy those pages into each worker
+anyway; the GC is therefore disabled while the app loads and every object
+that exists at fork time is moved to the permanent generation (gc.freeze),
+which the collector never scans. Reference counting still dirties the pages
+of objects a worker touches, so the saving is largest for the bulk of the
+model (weights, vocabulary) that sits in a few large buffers.
+
+The alternative is a parsing sidecar (parser_service.py, RESUME_PARSER_SOCKET)
+that holds the only copy of the model; benchmarks/parser_memory.py measures
+both.
+"""
+
+import gc
+import os
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("WEB_CONCURRENCY", "4"))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+
+# Disabled from here until each worker is forked, so no collection touches
+# (and unshares) the objects created while the app is imported
+gc.disable()
+
+
+def pre_fork(server, worker):
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    # Connections opened in the master (table creation, migrations) must not
+    # be shared with the children
+    from base import engine
+    engine.dispose(close=False)
+    gc.enable()
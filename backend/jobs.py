@@ -0,0 +1,485 @@
+#!/usr/bin/env python3
+"""
+Background jobs with checkpointing: full match recompute, match export,
+internship allocation and match table compaction.
+
+Jobs live in the jobs table. A JobScheduler claims queued jobs, runs them in a
+bounded thread pool and processes them one chunk at a time; every chunk's
+results are committed together with the job's checkpoint and progress, so a
+job interrupted by a crash resumes from its last completed chunk. Running
+jobs whose heartbeat goes stale (the process running them died) are requeued.
+The heartbeat is refreshed with every chunk and during slow setup steps, and
+checks that the job is still this run's: a run whose job was cancelled, or
+requeued and claimed again, rolls back its chunk and stops.
+
+The scheduler runs inside the API process by default (JOB_RUNNER=inprocess)
+or as a separate worker:
+
+    python jobs.py worker
+
+JOB_SCHEDULE enqueues jobs daily, e.g. JOB_SCHEDULE="recompute@02:00,allocation@04:00".
+"""
+
+import csv
+import logging
+import os
+import socket
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from sqlalchemy import update, or_, and_, func
+
+from models import Student, Internship, Match, Job
+from base import SessionLocal
+from catalog import load_catalog
+from matching import iter_top_match_rows, MATCH_THRESHOLD, TOP_K
+from student_features import load_student_features
+from batch_runner import BatchRunner, bulk_replace_matches
+from compaction import MatchCompactor, PHASES, COMPACTION_BATCH_SIZE, MATCH_ARCHIVE_DAYS
+
+JOB_RUNNER = os.environ.get("JOB_RUNNER", "inprocess")  # inprocess, external
+JOB_CONCURRENCY = int(os.environ.get("JOB_CONCURRENCY", "1"))
+JOB_POLL_SECONDS = float(os.environ.get("JOB_POLL_SECONDS", "2"))
+JOB_STALE_SECONDS = int(os.environ.get("JOB_STALE_SECONDS", "300"))
+JOB_SCHEDULE = os.environ.get("JOB_SCHEDULE", "")
+EXPORT_DIR = os.environ.get("EXPORT_DIR", "exports")
+
+DEFAULT_CHUNK_SIZE = 1000
+
+logger = logging.getLogger(__name__)
+
+
+class JobCancelled(Exception):
+    pass
+
+
+# Job kinds. Each is built with the session, the job and a heartbeat callable
+# for setup steps that may be slow, counts its total work and processes one
+# chunk per step(), returning how many items it handled (0 when finished).
+
+class RecomputeJob:
+    """Recompute the pending top matches of every active student."""
+
+    def __init__(self, db, job, heartbeat):
+        self.db = db
+        self.job = job
+        self.chunk_size = job.params.get("chunk_size", DEFAULT_CHUNK_SIZE)
+        self.workers = job.params.get("workers", 1)
+        self.catalog = load_catalog(db)
+        self.runner = None
+        if self.workers > 1:
+            heartbeat()
+            self.runner = BatchRunner(self.catalog, self.workers, MATCH_THRESHOLD, TOP_K).__enter__()
+
+    def count(self):
+        return self.db.query(Student).filter(Student.is_active == True).count()
+
+    def step(self):
+        after_id = (self.job.checkpoint or {}).get("after_id", 0)
+        # One chunk per worker, so every worker is busy each step
+        features = load_student_features(
+            self.db, Student.is_active == True, Student.id > after_id,
+            limit=self.chunk_size * max(1, self.workers)
+        )
+        if not features:
+            return 0
+
+        if self.runner:
+            chunks = [features[i:i + self.chunk_size] for i in range(0, len(features), self.chunk_size)]
+            rows = [row for _, chunk_rows in self.runner.map(chunks) for row in chunk_rows]
+        else:
+            rows = [
+                (feature.student_id, int(self.catalog.ids[index]), float(score))
+                for feature, indices, scores in iter_top_match_rows(features, self.catalog, MATCH_THRESHOLD, TOP_K)
+                for index, score in zip(indices, scores)
+            ]
+
+        bulk_replace_matches(self.db, [feature.student_id for feature in features], rows)
+        self.job.checkpoint = {"after_id": features[-1].student_id}
+        return len(features)
+
+    def close(self):
+        if self.runner:
+            self.runner.__exit__(None, None, None)
+
+
+class ExportJob:
+    """Write every match to a CSV file in EXPORT_DIR."""
+
+    COLUMNS = ("id", "student_id", "internship_id", "match_score", "status")
+
+    def __init__(self, db, job, heartbeat):
+        self.db = db
+        self.job = job
+        self.chunk_size = job.params.get("chunk_size", 5000)
+        os.makedirs(EXPORT_DIR, exist_ok=True)
+        self.path = os.path.join(EXPORT_DIR, f"matches-job{job.id}.csv")
+        checkpoint = job.checkpoint or {}
+        # Drop anything written after the last committed checkpoint
+        with open(self.path, "a+", newline="") as f:
+            f.truncate(checkpoint.get("bytes", 0))
+            if not checkpoint:
+                csv.writer(f).writerow(self.COLUMNS)
+                f.flush()
+                self.job.checkpoint = {"after_id": 0, "bytes": f.tell()}
+
+    def count(self):
+        return self.db.query(Match).count()
+
+    def step(self):
+        checkpoint = self.job.checkpoint
+        matches = (
+            self.db.query(Match.id, Match.student_id, Match.internship_id, Match.match_score, Match.status)
+            .filter(Match.id > checkpoint["after_id"])
+            .order_by(Match.id)
+            .limit(self.chunk_size)
+            .all()
+        )
+        if not matches:
+            return 0
+
+        with open(self.path, "a", newline="") as f:
+            csv.writer(f).writerows(matches)
+            f.flush()
+            os.fsync(f.fileno())
+            self.job.checkpoint = {"after_id": matches[-1].id, "bytes": f.tell()}
+        return len(matches)
+
+    def close(self):
+        pass
+
+
+class AllocationJob:
+    """
+    Greedy allocation: walk pending matches from the highest score down and
+    allocate each one whose student has no allocation yet and whose internship
+    still has open positions. State lives in Match.status, so resuming from
+    the (score, id) keyset checkpoint gives the same result as an unbroken run.
+    """
+
+    def __init__(self, db, job, heartbeat):
+        self.db = db
+        self.job = job
+        self.chunk_size = job.params.get("chunk_size", DEFAULT_CHUNK_SIZE)
+
+    def count(self):
+        return self.db.query(Match).filter(Match.status == "pending").count()
+
+    def step(self):
+        checkpoint = self.job.checkpoint or {}
+        query = self.db.query(Match).filter(Match.status == "pending")
+        if checkpoint:
+            query = query.filter(or_(
+                Match.match_score < checkpoint["score"],
+                and_(Match.match_score == checkpoint["score"], Match.id > checkpoint["id"])
+            ))
+        matches = query.order_by(Match.match_score.desc(), Match.id).limit(self.chunk_size).all()
+        if not matches:
+            return 0
+
+        student_ids = {match.student_id for match in matches}
+        internship_ids = {match.internship_id for match in matches}
+        allocated_students = {
+            student_id for (student_id,) in
+            self.db.query(Match.student_id)
+            .filter(Match.status == "allocated", Match.student_id.in_(student_ids))
+        }
+        filled = dict(
+            self.db.query(Match.internship_id, func.count(Match.id))
+            .filter(Match.status == "allocated", Match.internship_id.in_(internship_ids))
+            .group_by(Match.internship_id)
+        )
+        positions = dict(
+            self.db.query(Internship.id, Internship.positions_available)
+            .filter(Internship.id.in_(internship_ids), Internship.is_active == True)
+        )
+
+        for match in matches:
+            open_positions = (positions.get(match.internship_id) or 0) - filled.get(match.internship_id, 0)
+            if match.student_id in allocated_students or open_positions <= 0:
+                continue
+            match.status = "allocated"
+            allocated_students.add(match.student_id)
+            filled[match.internship_id] = filled.get(match.internship_id, 0) + 1
+
+        last = matches[-1]
+        self.job.checkpoint = {"score": last.match_score, "id": last.id}
+        return len(matches)
+
+    def close(self):
+        pass
+
+
+class CompactionJob:
+    """Purge orphan matches, deduplicate pending ones and archive old decided ones."""
+
+    def __init__(self, db, job, heartbeat):
+        self.db = db
+        self.job = job
+        self.compactor = MatchCompactor(
+            db,
+            job.params.get("batch_size", COMPACTION_BATCH_SIZE),
+            job.params.get("archive_days", MATCH_ARCHIVE_DAYS)
+        )
+
+    def count(self):
+        # An estimate: every phase walks the match table, but rows deleted by
+        # an earlier phase aren't visited by the later ones
+        return self.db.query(Match).count() * len(PHASES)
+
+    def step(self):
+        if self.job.checkpoint and self.job.checkpoint.get("done"):
+            return 0
+        while True:
+            scanned, checkpoint = self.compactor.step(self.job.checkpoint)
+            self.job.checkpoint = checkpoint or {"done": True}
+            # A phase switch with nothing scanned moves straight on; the
+            # final checkpoint commits with the completed job
+            if scanned or checkpoint is None:
+                return scanned
+
+    def close(self):
+        pass
+
+
+JOB_KINDS = {
+    "recompute": RecomputeJob,
+    "export": ExportJob,
+    "allocation": AllocationJob,
+    "compact": CompactionJob
+}
+
+
+def create_job(db, kind: str, params=None) -> Job:
+    if kind not in JOB_KINDS:
+        raise ValueError(f"Unknown job kind: {kind}")
+    job = Job(kind=kind, params=params or {}, status="queued", processed=0)
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def job_status(job: Job) -> dict:
+    """Job fields plus progress, throughput (items/s in the current run) and ETA."""
+    progress = None
+    if job.total:
+        progress = round(min(1.0, (job.processed or 0) / job.total), 4)
+    elif job.status == "completed":
+        progress = 1.0
+
+    throughput = None
+    eta_seconds = None
+    if job.status == "running" and job.run_started_at:
+        elapsed = (datetime.utcnow() - job.run_started_at).total_seconds()
+        done = (job.processed or 0) - (job.run_start_processed or 0)
+        if elapsed > 0 and done > 0:
+            throughput = round(done / elapsed, 2)
+            if job.total:
+                eta_seconds = round(max(0, job.total - job.processed) / throughput, 1)
+
+    return {
+        "id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "params": job.params,
+        "processed": job.processed,
+        "total": job.total,
+        "progress": progress,
+        "throughput": throughput,
+        "eta_seconds": eta_seconds,
+        "checkpoint": job.checkpoint,
+        "worker": job.worker,
+        "error": job.error,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at
+    }
+
+
+def _this_run(job_id: int, worker: str, claimed_at: datetime):
+    """Criteria matching the job only while it is still running under this claim."""
+    return (Job.id == job_id, Job.status == "running", Job.worker == worker, Job.run_started_at == claimed_at)
+
+
+def heartbeat(db, job_id: int, worker: str, claimed_at: datetime):
+    """
+    Refresh the job's heartbeat and commit it together with the work pending
+    in the session. If the job was cancelled, or requeued and claimed again,
+    roll that work back instead and raise JobCancelled.
+    """
+    alive = db.execute(
+        update(Job).where(*_this_run(job_id, worker, claimed_at)).values(updated_at=datetime.utcnow())
+    ).rowcount == 1
+    if not alive:
+        db.rollback()
+        raise JobCancelled()
+    db.commit()
+
+
+def run_job(job_id: int, worker: str, claimed_at: datetime):
+    """Run (or resume) a job claimed by `worker` at `claimed_at`, checkpointing every chunk."""
+    db = SessionLocal()
+    job = db.query(Job).filter(Job.id == job_id).first()
+    runner = None
+
+    def beat():
+        heartbeat(db, job_id, worker, claimed_at)
+
+    try:
+        runner = JOB_KINDS[job.kind](db, job, beat)
+        beat()
+        if job.total is None:
+            job.total = runner.count()
+        beat()
+
+        while True:
+            handled = runner.step()
+            if not handled:
+                break
+            job.processed = (job.processed or 0) + handled
+            beat()  # Chunk results and checkpoint together
+
+        job.status = "completed"
+        job.finished_at = datetime.utcnow()
+        # Totals are counted up front and rows come and go while the job
+        # runs: once it's done, the work it actually did is its total
+        job.total = job.processed
+        beat()
+    except JobCancelled:
+        db.rollback()
+    except Exception as e:
+        db.rollback()
+        db.execute(
+            update(Job).where(*_this_run(job_id, worker, claimed_at))
+            .values(status="failed", error=str(e), finished_at=datetime.utcnow())
+        )
+        db.commit()
+    finally:
+        if runner:
+            runner.close()
+        db.close()
+
+
+class JobScheduler:
+    """Claims queued jobs and runs at most JOB_CONCURRENCY of them at a time."""
+
+    def __init__(self, concurrency: int = JOB_CONCURRENCY, schedule: str = JOB_SCHEDULE):
+        self.concurrency = max(1, concurrency)
+        self.schedule = self._parse_schedule(schedule)
+        self.name = f"{socket.gethostname()}:{os.getpid()}"
+        self.pool = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="job")
+        self.running = set()
+        self.stopped = threading.Event()
+
+    @staticmethod
+    def _parse_schedule(schedule: str):
+        entries = []
+        for entry in filter(None, (part.strip() for part in schedule.split(","))):
+            kind, _, at = entry.partition("@")
+            hour, minute = (int(value) for value in at.split(":"))
+            entries.append((kind, hour, minute))
+        return entries
+
+    def start(self):
+        threading.Thread(target=self.run_forever, daemon=True, name="job-scheduler").start()
+
+    def stop(self):
+        self.stopped.set()
+
+    def run_forever(self):
+        while not self.stopped.is_set():
+            try:
+                self.tick()
+            except Exception:
+                logger.exception("Job scheduler error")
+            self.stopped.wait(JOB_POLL_SECONDS)
+
+    def tick(self):
+        db = SessionLocal()
+        try:
+            self._enqueue_scheduled(db)
+            self._requeue_stale(db)
+            self.running = {future for future in self.running if not future.done()}
+            running_anywhere = db.query(Job).filter(Job.status == "running").count()
+            free = min(self.concurrency - len(self.running), self.concurrency - running_anywhere)
+            if free <= 0:
+                return
+            queued = db.query(Job.id).filter(Job.status == "queued").order_by(Job.id).limit(free).all()
+            for (job_id,) in queued:
+                claimed_at = self._claim(db, job_id)
+                if claimed_at is not None:
+                    self.running.add(self.pool.submit(run_job, job_id, self.name, claimed_at))
+        finally:
+            db.close()
+
+    def _claim(self, db, job_id: int):
+        """Atomically move a queued job to running; returns the claim time, None if another worker got it."""
+        job = db.query(Job).filter(Job.id == job_id).first()
+        now = datetime.utcnow()
+        claimed = db.execute(
+            update(Job)
+            .where(Job.id == job_id, Job.status == "queued")
+            .values(status="running", worker=self.name, run_started_at=now,
+                    run_start_processed=job.processed or 0, updated_at=now,
+                    started_at=job.started_at or now)
+        ).rowcount == 1
+        db.commit()
+        return now if claimed else None
+
+    def _requeue_stale(self, db):
+        """Running jobs without a recent heartbeat belong to a dead process."""
+        cutoff = datetime.utcnow() - timedelta(seconds=JOB_STALE_SECONDS)
+        db.execute(
+            update(Job)
+            .where(Job.status == "running", Job.updated_at < cutoff)
+            .values(status="queued", worker=None)
+        )
+        db.commit()
+
+    def _enqueue_scheduled(self, db):
+        now = datetime.now()
+        for kind, hour, minute in self.schedule:
+            due = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+            if now < due:
+                continue
+            # created_at is UTC
+            due_utc = datetime.utcnow() - (now - due)
+            already = db.query(Job).filter(Job.kind == kind, Job.created_at >= due_utc).first()
+            if not already:
+                create_job(db, kind, {"scheduled": due.isoformat()})
+
+
+_scheduler = None
+
+
+def start_scheduler():
+    """Start the in-process scheduler unless jobs run in a separate worker."""
+    global _scheduler
+    if JOB_RUNNER == "inprocess" and _scheduler is None:
+        _scheduler = JobScheduler()
+        _scheduler.start()
+
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] != "worker":
+        print("Usage: python jobs.py worker")
+        sys.exit(1)
+
+    from base import Base, engine
+    from migrations import upgrade
+    Base.metadata.create_all(bind=engine)
+    upgrade(engine)
+
+    scheduler = JobScheduler()
+    print(f"Job worker {scheduler.name} started (concurrency {scheduler.concurrency})")
+    try:
+        scheduler.run_forever()
+    except KeyboardInterrupt:
+        scheduler.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+"""
+Open-loop load generator with a realistic traffic mix.
+
+Starts the app locally (uvicorn in a scratch directory, so it gets its own
+internship.db) unless --base-url points at a running deployment, seeds it
+through the API with data_generator fixtures, then sends a weighted mix of
+requests:
+
+    matches   GET /matches/{student_id} for a random seeded student
+    students  POST /students/ with a generated student
+    upload    POST /upload_resume/ with a generated DOCX resume
+    admin     GET one of the admin lists or /admin/stats
+
+Arrivals are open-loop: a Poisson process at the target rate, each request
+sent on schedule whether or not earlier ones have completed, the way real
+users arrive. Latency is measured from the scheduled arrival time, so time
+spent queued behind a slow server counts against it (no coordinated
+omission). Several comma-separated rates run as consecutive stages, which
+shows where latency and errors take off. Throughput, p50/p95/p99 latency and
+error rate per route are printed and written as JSON to --output.
+
+    python loadtest.py --rate 5,10,20 --duration 30
+    python loadtest.py --mix matches=80,admin=20 --workers 4
+    python loadtest.py --base-url http://staging:8000 --seed-students 0
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime
+
+import httpx
+import numpy as np
+
+from data_generator import generate_random_student, generate_random_employer, generate_random_internship
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_MIX = "matches=60,students=10,upload=5,admin=25"
+ADMIN_PATHS = ["/admin/students/", "/admin/internships/", "/admin/employers/", "/admin/matches/", "/admin/stats"]
+DOCX_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+SEED_CONCURRENCY = 8
+RESUME_FIXTURES = 20
+
+
+def parse_mix(value: str) -> dict:
+    mix = {}
+    for part in value.split(","):
+        kind, _, weight = part.partition("=")
+        kind = kind.strip()
+        if kind not in ("matches", "students", "upload", "admin"):
+            raise argparse.ArgumentTypeError(f"Unknown request kind: {kind}")
+        mix[kind] = float(weight or 1)
+    return mix
+
+
+def resume_docx(student: dict) -> bytes:
+    """A resume for a generated student, as DOCX bytes."""
+    from docx import Document
+
+    document = Document()
+    for line in [
+        student["full_name"],
+        f"Email: {student['email']}",
+        "EDUCATION",
+        f"B.Tech in {student['degree']}, {2024 - student['year_of_study']} - Present, CGPA {student['cgpa']}/10",
+        "SKILLS",
+        ", ".join(student["skills"]),
+        "INTERESTS",
+        *student["preferences"],
+    ]:
+        document.add_paragraph(line)
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+class RouteStats:
+    """Outcomes of the requests sent to one route."""
+
+    def __init__(self):
+        self.latencies = []
+        self.status_codes = Counter()
+        self.failures = Counter()  # Exceptions: timeouts, refused connections, ...
+        self.errors = 0
+
+    def record(self, latency: float, status_code: int = None, failure: str = None):
+        self.latencies.append(latency)
+        if failure is not None:
+            self.failures[failure] += 1
+            self.errors += 1
+        else:
+            self.status_codes[status_code] += 1
+            if status_code >= 400:
+                self.errors += 1
+
+    def merge(self, other: "RouteStats"):
+        self.latencies.extend(other.latencies)
+        self.status_codes.update(other.status_codes)
+        self.failures.update(other.failures)
+        self.errors += other.errors
+
+    def summary(self, elapsed: float) -> dict:
+        requests = len(self.latencies)
+        latencies = np.asarray(self.latencies) * 1000
+        percentiles = np.percentile(latencies, [50, 95, 99]) if requests else [None] * 3
+        return {
+            "requests": requests,
+            "errors": self.errors,
+            "error_rate": round(self.errors / requests, 4) if requests else 0.0,
+            "throughput_rps": round(requests / elapsed, 2),
+            "success_rps": round((requests - self.errors) / elapsed, 2),
+            "latency_ms": {
+                "p50": _round(percentiles[0]),
+                "p95": _round(percentiles[1]),
+                "p99": _round(percentiles[2]),
+                "mean": _round(latencies.mean()) if requests else None,
+                "max": _round(latencies.max()) if requests else None
+            },
+            "status_codes": {str(code): count for code, count in sorted(self.status_codes.items())},
+            "failures": dict(self.failures)
+        }
+
+
+def _round(value):
+    return None if value is None else round(float(value), 2)
+
+
+class TrafficMix:
+    """Turns a request kind into a concrete request, from the seeded fixtures."""
+
+    def __init__(self, mix: dict, student_ids, resumes, rng):
+        self.kinds = list(mix)
+        self.weights = [mix[kind] for kind in self.kinds]
+        self.student_ids = student_ids
+        self.resumes = resumes
+        self.rng = rng
+
+    def next_kind(self) -> str:
+        return self.rng.choices(self.kinds, self.weights)[0]
+
+    def request(self, kind: str):
+        """(route name, method, path, request kwargs)"""
+        if kind == "matches":
+            student_id = self.rng.choice(self.student_ids)
+            return "GET /matches/{student_id}", "GET", f"/matches/{student_id}", {}
+        if kind == "students":
+            return "POST /students/", "POST", "/students/", {"json": generate_random_student()}
+        if kind == "upload":
+            files = {"file": ("resume.docx", self.rng.choice(self.resumes), DOCX_TYPE)}
+            return "POST /upload_resume/", "POST", "/upload_resume/", {"files": files}
+        path = self.rng.choice(ADMIN_PATHS)
+        return f"GET {path}", "GET", path, {}
+
+
+async def send(client, traffic: TrafficMix, kind: str, scheduled: float, stats: dict):
+    route, method, path, kwargs = traffic.request(kind)
+    route_stats = stats.setdefault(route, RouteStats())
+    loop = asyncio.get_running_loop()
+    try:
+        response = await client.request(method, path, **kwargs)
+    except httpx.HTTPError as e:
+        route_stats.record(loop.time() - scheduled, failure=type(e).__name__)
+    else:
+        route_stats.record(loop.time() - scheduled, status_code=response.status_code)
+
+
+async def run_stage(client, traffic: TrafficMix, rate: float, duration: float, max_in_flight: int) -> dict:
+    """Send Poisson arrivals at `rate` per second for `duration` seconds, then drain."""
+    loop = asyncio.get_running_loop()
+    stats = {}
+    in_flight = set()
+    dropped = 0
+    start = arrival = loop.time()
+    while True:
+        arrival += traffic.rng.expovariate(rate)
+        if arrival - start >= duration:
+            break
+        delay = arrival - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        kind = traffic.next_kind()
+        if len(in_flight) >= max_in_flight:
+            dropped += 1  # The client itself is saturated; count it rather than block
+            continue
+        task = asyncio.create_task(send(client, traffic, kind, arrival, stats))
+        in_flight.add(task)
+        task.add_done_callback(in_flight.discard)
+    if in_flight:
+        await asyncio.wait(in_flight)
+    elapsed = loop.time() - start
+
+    total = RouteStats()
+    for route_stats in stats.values():
+        total.merge(route_stats)
+    return {
+        "rate": rate,
+        "duration_seconds": duration,
+        "elapsed_seconds": round(elapsed, 3),
+        "dropped": dropped,
+        "routes": {route: stats[route].summary(elapsed) for route in sorted(stats)},
+        "total": total.summary(elapsed)
+    }
+
+
+async def seed(client, employers: int, internships: int, students: int) -> list:
+    """Create fixtures through the API; return the ids of all students."""
+    semaphore = asyncio.Semaphore(SEED_CONCURRENCY)
+
+    async def post(path, payload):
+        async with semaphore:
+            response = await client.post(path, json=payload)
+            response.raise_for_status()
+
+    await asyncio.gather(*(post("/employers/", generate_random_employer()) for _ in range(employers)))
+    if internships:
+        response = await client.get("/admin/employers/")
+        response.raise_for_status()
+        employer_ids = [employer["id"] for employer in response.json()]
+        if not employer_ids:
+            raise SystemExit("No employers to attach internships to; pass --seed-employers")
+        await asyncio.gather(*(
+            post("/internships/", generate_random_internship(random.choice(employer_ids)))
+            for _ in range(internships)
+        ))
+    await asyncio.gather(*(post("/students/", generate_random_student()) for _ in range(students)))
+
+    response = await client.get("/admin/students/")
+    response.raise_for_status()
+    return [student["id"] for student in response.json()]
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def start_local_app(directory: str, workers: int):
+    """Start uvicorn on a free port with `directory` as its working directory."""
+    port = _free_port()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--app-dir", BACKEND_DIR,
+         "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+        cwd=directory
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        deadline = time.monotonic() + 60
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise SystemExit(f"The app exited with status {process.returncode}")
+            try:
+                if (await client.get("/admin/stats")).status_code == 200:
+                    return process, base_url
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.25)
+    process.terminate()
+    raise SystemExit("The app did not start within 60 seconds")
+
+
+def print_stage(stage: dict):
+    print(f"\nRate {stage['rate']:g}/s for {stage['duration_seconds']:g}s"
+          f" ({stage['dropped']} dropped by the client)")
+    print(f"{'route':<32}{'requests':>9}{'rps':>8}{'errors':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for route, summary in [*stage["routes"].items(), ("total", stage["total"])]:
+        latency = summary["latency_ms"]
+        print(f"{route:<32}{summary['requests']:>9}{summary['throughput_rps']:>8}"
+              f"{summary['error_rate']:>8.1%}{_format(latency['p50'])}{_format(latency['p95'])}"
+              f"{_format(latency['p99'])}")
+
+
+def _format(value) -> str:
+    return f"{'-':>9}" if value is None else f"{value:>9.1f}"
+
+
+async def run(args) -> dict:
+    started_at = datetime.utcnow().isoformat()
+    directory = None
+    process = None
+    base_url = args.base_url
+    try:
+        if base_url is None:
+            directory = tempfile.mkdtemp(prefix="loadtest-")
+            process, base_url = await start_local_app(directory, args.workers)
+            print(f"Started the app at {base_url} in {directory}")
+
+        limits = httpx.Limits(max_connections=args.max_in_flight, max_keepalive_connections=args.max_in_flight)
+        async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits) as client:
+            student_ids = await seed(client, args.seed_employers, args.seed_internships, args.seed_students)
+            if not student_ids and "matches" in args.mix:
+                raise SystemExit("No students to match; seed some with --seed-students")
+            print(f"Seeded: {args.seed_employers} employers, {args.seed_internships} internships, "
+                  f"{args.seed_students} students ({len(student_ids)} students in total)")
+
+            rng = random.Random(args.seed)
+            random.seed(args.seed)  # data_generator draws from the global generator
+            resumes = [resume_docx(generate_random_student()) for _ in range(RESUME_FIXTURES)]
+            traffic = TrafficMix(args.mix, student_ids, resumes, rng)
+
+            stages = []
+            for rate in args.rate:
+                stage = await run_stage(client, traffic, rate, args.duration, args.max_in_flight)
+                print_stage(stage)
+                stages.append(stage)
+    finally:
+        if process is not None:
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        if directory is not None:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    return {
+        "started_at": started_at,
+        "target": args.base_url or "local",
+        "config": {
+            "mix": args.mix,
+            "rates": args.rate,
+            "duration_seconds": args.duration,
+            "max_in_flight": args.max_in_flight,
+            "timeout_seconds": args.timeout,
+            "workers": args.workers if args.base_url is None else None,
+            "seed": args.seed
+        },
+        "stages": stages
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Open-loop load test with a realistic traffic mix")
+    parser.add_argument("--base-url", help="Test a running deployment instead of starting the app locally")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers for the local app")
+    parser.add_argument("--rate", type=lambda value: [float(rate) for rate in value.split(",")], default=[10.0],
+                        help="Arrivals per second; several comma-separated rates run as stages")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds per stage")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX),
+                        help=f"Request kinds and weights (default {DEFAULT_MIX})")
+    parser.add_argument("--max-in-flight", type=int, default=500,
+                        help="Outstanding requests after which arrivals are dropped")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Per-request timeout in seconds")
+    parser.add_argument("--seed-employers", type=int, default=10)
+    parser.add_argument("--seed-internships", type=int, default=100)
+    parser.add_argument("--seed-students", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for arrivals and fixtures")
+    parser.add_argument("--output", default="loadtest-report.json", help="Where to write the JSON report")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nReport written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,56 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException, Depends
+from fastapi import FastAPI, UploadFile, File, HTTPException, Depends, Request, Response, BackgroundTasks, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from sqlalchemy import delete
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 from typing import List, Optional
+import orjson
 import os
 import shutil
+import threading
 
-from models import Student, Internship, Employer, Match
-from base import get_db, engine, Base
-from matching import find_matches_for_student, save_match
+from models import Student, Internship, Employer, Match, Job
+from base import get_db, engine, Base, SessionLocal
+from matching import (
+    find_matches_for_student, iter_top_match_rows,
+    candidate_catalog, iter_progressive_matches, replace_matches, TOP_K
+)
+from student_features import load_features, load_student_features
+from catalog import get_catalog
+from batch_runner import bulk_replace_matches
 from resume_parser import process_resume_file
+from rematch import record_change, process_changes
+from serialization import (
+    STUDENT_COLUMNS, INTERNSHIP_COLUMNS, EMPLOYER_COLUMNS, MATCH_COLUMNS, list_rows, row_dict
+)
+from jobs import JOB_KINDS, create_job, job_status, start_scheduler
+from profiler import ProfiledRoute, profiling_middleware, install_sql_logging, get_profiles, get_profile
+from revisions import ensure_revisions, revision_validators
+from migrations import upgrade
+from admission import AdmissionMiddleware, stats as admission_stats
+from search import search_internships
 
 # Create database tables
 Base.metadata.create_all(bind=engine)
+upgrade(engine)
+ensure_revisions(engine)
+
+app = FastAPI(
+    title="Smart Internship Allocation Engine",
+    version="1.0.0",
+    default_response_class=ORJSONResponse
+)
+# Must be set before any route is declared so endpoints can be profiled
+app.router.route_class = ProfiledRoute
+
+# Opt-in profiling (X-Profile: 1 header or PROFILE_SAMPLE_RATE)
+install_sql_logging(engine)
+app.middleware("http")(profiling_middleware)
 
-app = FastAPI(title="Smart Internship Allocation Engine", version="1.0.0")
+# Concurrency limits and wait queues for resume parsing and matching. Added
+# before CORS so that rejections still carry CORS headers.
+app.add_middleware(AdmissionMiddleware)
 
 # CORS middleware
 app.add_middleware(
@@ -25,6 +61,16 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.on_event("startup")
+def resume_rematching():
+    # Finish any change-log sweep interrupted by a crash or restart
+    threading.Thread(target=process_changes, daemon=True).start()
+
+@app.on_event("startup")
+def start_jobs():
+    # Runs queued and scheduled jobs unless JOB_RUNNER=external
+    start_scheduler()
+
 # Pydantic models for request/response
 class StudentCreate(BaseModel):
     email: str
@@ -51,6 +97,17 @@ class EmployerCreate(BaseModel):
     industry: str
     description: str
 
+class JobCreate(BaseModel):
+    kind: str
+    params: Optional[dict] = None
+
+class BatchMatchRequest(BaseModel):
+    # Either explicit ids or a cohort filter (degree and/or year of study)
+    student_ids: Optional[List[int]] = None
+    degree: Optional[str] = None
+    year_of_study: Optional[int] = None
+    threshold: float = 0.5
+
 class MatchResponse(BaseModel):
     internship_id: int
     title: str
@@ -59,31 +116,163 @@ class MatchResponse(BaseModel):
     domain: str
     match_score: float
 
+# Response schemas for the admin listings. These document the rows; the
+# endpoints build plain dicts from column tuples and skip model validation.
+class StudentOut(StudentCreate):
+    id: int
+    resume_url: Optional[str] = None
+    is_active: Optional[bool] = None
+
+class InternshipOut(InternshipCreate):
+    id: int
+    is_active: Optional[bool] = None
+
+class EmployerOut(EmployerCreate):
+    id: int
+    is_active: Optional[bool] = None
+
+class MatchOut(BaseModel):
+    id: int
+    student_id: int
+    internship_id: int
+    match_score: float
+    status: str
+
 # Endpoints
 
 @app.post("/students/", response_model=StudentCreate)
-def create_student(student: StudentCreate, db: Session = Depends(get_db)):
+def create_student(student: StudentCreate, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
     db_student = Student(**student.dict())
     db.add(db_student)
+    db.flush()
+    record_change(db, "student", db_student.id)
     db.commit()
     db.refresh(db_student)
+    background_tasks.add_task(process_changes)
     return db_student
 
 @app.post("/internships/", response_model=InternshipCreate)
-def create_internship(internship: InternshipCreate, db: Session = Depends(get_db)):
+def create_internship(internship: InternshipCreate, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
     db_internship = Internship(**internship.dict())
     db.add(db_internship)
+    db.flush()
+    record_change(db, "internship", db_internship.id)
     db.commit()
     db.refresh(db_internship)
+    background_tasks.add_task(process_changes)
     return db_internship
 
+@app.get("/internships/search")
+def search_internships_endpoint(
+    q: str = Query(..., min_length=1, max_length=200),
+    cgpa: Optional[float] = None,
+    year_of_study: Optional[int] = None,
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_db)
+):
+    """Ranked keyword search over active internships, optionally only those a student qualifies for."""
+    return search_internships(db, q, cgpa=cgpa, year_of_study=year_of_study, limit=limit, offset=offset)
+
 @app.get("/matches/{student_id}", response_model=List[MatchResponse])
-def get_matches(student_id: int, db: Session = Depends(get_db)):
-    matches = find_matches_for_student(student_id)
-    # Save matches to DB
-    for match in matches:
-        save_match(student_id, match["internship_id"], match["match_score"])
-    return matches
+def get_matches(student_id: int, request: Request, db: Session = Depends(get_db)):
+    # Matches depend only on the student and the catalog; if neither changed
+    # since the client's copy, skip scoring and saving entirely
+    validators = revision_validators(db, ("students", "internships"), f"matches-{student_id}")
+    if validators.is_fresh(request):
+        return validators.not_modified()
+
+    # Scored against a catalog at least as new as the revision in the ETag,
+    # so a cached copy is never older than its validator claims
+    matches = find_matches_for_student(student_id, min_catalog_version=validators.revisions.get("internships"))
+    # Make them the student's pending matches, in this session and one commit
+    replace_matches(db, student_id, matches)
+    db.commit()
+    # Already plain dicts: skip re-validating them through MatchResponse
+    return ORJSONResponse(matches, headers=validators.headers)
+
+def sse_event(event: str, data) -> bytes:
+    return f"event: {event}\ndata: ".encode() + orjson.dumps(data) + b"\n\n"
+
+@app.get("/matches/{student_id}/stream")
+def stream_matches(student_id: int, db: Session = Depends(get_db)):
+    """
+    Server-Sent Events variant of GET /matches/{student_id}. After each chunk
+    of the catalog is scored, a "progress" event carries the best matches so
+    far; once they are saved, a "done" event carries the final ones. A client
+    that disconnects early stops the scoring, and nothing is saved.
+    """
+    features = load_features(db, student_id)
+    if features is None:
+        raise HTTPException(status_code=404, detail="Student not found")
+    catalog = candidate_catalog(features)
+
+    def events():
+        matches = []
+        for scored, matches in iter_progressive_matches(features, catalog, limit=TOP_K):
+            yield sse_event("progress", {"scored": scored, "total": len(catalog), "matches": matches})
+        writer = SessionLocal()
+        try:
+            replace_matches(writer, student_id, matches)
+            writer.commit()
+        finally:
+            writer.close()
+        yield sse_event("done", {"matches": matches})
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"  # Don't let a reverse proxy hold events back
+    })
+
+@app.post("/matches/batch")
+def get_matches_batch(request: BatchMatchRequest, db: Session = Depends(get_db)):
+    """
+    Match many students in one request: the catalog is loaded once, all
+    students are scored together, and their pending matches are replaced in
+    a single bulk write. Results stream back as NDJSON, one line per student.
+    """
+    criteria = []
+    if request.student_ids is not None:
+        criteria.append(Student.id.in_(request.student_ids))
+    elif request.degree is not None or request.year_of_study is not None:
+        if request.degree is not None:
+            criteria.append(Student.degree == request.degree)
+        if request.year_of_study is not None:
+            criteria.append(Student.year_of_study == request.year_of_study)
+        criteria.append(Student.is_active == True)
+    else:
+        raise HTTPException(status_code=400, detail="Provide student_ids or a degree/year_of_study filter")
+    features = load_student_features(db, *criteria)
+
+    catalog = get_catalog()
+    results = [
+        (feature.student_id, indices, scores)
+        for feature, indices, scores in iter_top_match_rows(features, catalog, request.threshold, TOP_K)
+    ]
+    bulk_replace_matches(db, [feature.student_id for feature in features], [
+        (student_id, int(catalog.ids[index]), float(score))
+        for student_id, indices, scores in results
+        for index, score in zip(indices, scores)
+    ])
+    db.commit()
+
+    missing = []
+    if request.student_ids is not None:
+        found = {feature.student_id for feature in features}
+        missing = [student_id for student_id in dict.fromkeys(request.student_ids) if student_id not in found]
+
+    def lines():
+        for student_id, indices, scores in results:
+            matches = []
+            for index, score in zip(indices, scores):
+                match = catalog.record(index)
+                match["match_score"] = float(score)
+                matches.append(match)
+            yield orjson.dumps({"student_id": student_id, "matches": matches}) + b"\n"
+        for student_id in missing:
+            yield orjson.dumps({"student_id": student_id, "error": "Student not found"}) + b"\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
 
 @app.post("/upload_resume/")
 def upload_resume(file: UploadFile = File(...)):
@@ -108,58 +297,80 @@ def upload_resume(file: UploadFile = File(...)):
 
 # Admin CRUD endpoints
 
-@app.get("/admin/students/")
-def get_students(db: Session = Depends(get_db)):
-    return db.query(Student).all()
+@app.get("/admin/students/", response_model=List[StudentOut])
+def get_students(request: Request, db: Session = Depends(get_db)):
+    validators = revision_validators(db, ("students",), "students")
+    if validators.is_fresh(request):
+        return validators.not_modified()
+    return ORJSONResponse(list_rows(db, STUDENT_COLUMNS, Student.id), headers=validators.headers)
 
-@app.get("/admin/internships/")
-def get_internships(db: Session = Depends(get_db)):
-    return db.query(Internship).all()
+@app.get("/admin/internships/", response_model=List[InternshipOut])
+def get_internships(request: Request, db: Session = Depends(get_db)):
+    validators = revision_validators(db, ("internships",), "internships")
+    if validators.is_fresh(request):
+        return validators.not_modified()
+    return ORJSONResponse(list_rows(db, INTERNSHIP_COLUMNS, Internship.id), headers=validators.headers)
 
-@app.get("/admin/employers/")
-def get_employers(db: Session = Depends(get_db)):
-    return db.query(Employer).all()
+@app.get("/admin/employers/", response_model=List[EmployerOut])
+def get_employers(request: Request, db: Session = Depends(get_db)):
+    validators = revision_validators(db, ("employers",), "employers")
+    if validators.is_fresh(request):
+        return validators.not_modified()
+    return ORJSONResponse(list_rows(db, EMPLOYER_COLUMNS, Employer.id), headers=validators.headers)
 
-@app.get("/admin/matches/")
-def get_matches_admin(db: Session = Depends(get_db)):
-    return db.query(Match).all()
+@app.get("/admin/matches/", response_model=List[MatchOut])
+def get_matches_admin(request: Request, db: Session = Depends(get_db)):
+    validators = revision_validators(db, ("matches",), "matches")
+    if validators.is_fresh(request):
+        return validators.not_modified()
+    return ORJSONResponse(list_rows(db, MATCH_COLUMNS, Match.id), headers=validators.headers)
 
-@app.put("/admin/students/{student_id}")
-def update_student(student_id: int, student: StudentCreate, db: Session = Depends(get_db)):
+@app.put("/admin/students/{student_id}", response_model=StudentOut)
+def update_student(student_id: int, student: StudentCreate, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
     db_student = db.query(Student).filter(Student.id == student_id).first()
     if not db_student:
         raise HTTPException(status_code=404, detail="Student not found")
     for key, value in student.dict().items():
         setattr(db_student, key, value)
+    record_change(db, "student", student_id)
     db.commit()
-    return db_student
+    background_tasks.add_task(process_changes)
+    return ORJSONResponse(row_dict(db_student, STUDENT_COLUMNS))
 
-@app.put("/admin/internships/{internship_id}")
-def update_internship(internship_id: int, internship: InternshipCreate, db: Session = Depends(get_db)):
+@app.put("/admin/internships/{internship_id}", response_model=InternshipOut)
+def update_internship(internship_id: int, internship: InternshipCreate, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
     db_internship = db.query(Internship).filter(Internship.id == internship_id).first()
     if not db_internship:
         raise HTTPException(status_code=404, detail="Internship not found")
     for key, value in internship.dict().items():
         setattr(db_internship, key, value)
+    record_change(db, "internship", internship_id)
     db.commit()
-    return db_internship
+    background_tasks.add_task(process_changes)
+    return ORJSONResponse(row_dict(db_internship, INTERNSHIP_COLUMNS))
 
 @app.delete("/admin/students/{student_id}")
-def delete_student(student_id: int, db: Session = Depends(get_db)):
+def delete_student(student_id: int, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
     db_student = db.query(Student).filter(Student.id == student_id).first()
     if not db_student:
         raise HTTPException(status_code=404, detail="Student not found")
     db.delete(db_student)
+    # Cascade: a deleted student's matches, whatever their status, are orphans
+    db.execute(delete(Match).where(Match.student_id == student_id))
+    record_change(db, "student", student_id)
     db.commit()
+    background_tasks.add_task(process_changes)
     return {"message": "Student deleted"}
 
 @app.delete("/admin/internships/{internship_id}")
-def delete_internship(internship_id: int, db: Session = Depends(get_db)):
+def delete_internship(internship_id: int, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
     db_internship = db.query(Internship).filter(Internship.id == internship_id).first()
     if not db_internship:
         raise HTTPException(status_code=404, detail="Internship not found")
     db.delete(db_internship)
+    record_change(db, "internship", internship_id)
     db.commit()
+    background_tasks.add_task(process_changes)
     return {"message": "Internship deleted"}
 
 # Employer endpoints
@@ -199,14 +410,94 @@ def clear_data(data_type: str, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=f"Error clearing data: {str(e)}")
 
 @app.get("/admin/stats")
-def get_database_stats(db: Session = Depends(get_db)):
+def get_database_stats(request: Request, db: Session = Depends(get_db)):
     """Get database statistics"""
-    return {
+    validators = revision_validators(db, ("employers", "students", "internships", "matches"), "stats")
+    if validators.is_fresh(request):
+        return validators.not_modified()
+    return ORJSONResponse({
         "employers": db.query(Employer).count(),
         "students": db.query(Student).count(),
         "internships": db.query(Internship).count(),
         "matches": db.query(Match).count()
-    }
+    }, headers=validators.headers)
+
+# Background job endpoints
+@app.post("/admin/jobs")
+def create_job_endpoint(job: JobCreate, db: Session = Depends(get_db)):
+    """Queue a recompute, export or allocation job"""
+    if job.kind not in JOB_KINDS:
+        raise HTTPException(status_code=400, detail=f"Invalid job kind, expected one of: {', '.join(JOB_KINDS)}")
+    return job_status(create_job(db, job.kind, job.params))
+
+@app.get("/admin/jobs")
+def list_jobs(db: Session = Depends(get_db)):
+    """All jobs with progress, throughput and ETA, newest first"""
+    return [job_status(job) for job in db.query(Job).order_by(Job.id.desc()).all()]
+
+@app.get("/admin/jobs/{job_id}")
+def get_job(job_id: int, db: Session = Depends(get_db)):
+    db_job = db.query(Job).filter(Job.id == job_id).first()
+    if not db_job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_status(db_job)
+
+@app.post("/admin/jobs/{job_id}/cancel")
+def cancel_job(job_id: int, db: Session = Depends(get_db)):
+    """Stop a queued or running job after its current chunk"""
+    db_job = db.query(Job).filter(Job.id == job_id).first()
+    if not db_job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if db_job.status not in ("queued", "running"):
+        raise HTTPException(status_code=400, detail=f"Job is already {db_job.status}")
+    db_job.status = "cancelled"
+    db.commit()
+    return job_status(db_job)
+
+@app.post("/admin/jobs/{job_id}/resume")
+def resume_job(job_id: int, db: Session = Depends(get_db)):
+    """Requeue a failed or cancelled job; it continues from its last checkpoint"""
+    db_job = db.query(Job).filter(Job.id == job_id).first()
+    if not db_job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if db_job.status not in ("failed", "cancelled"):
+        raise HTTPException(status_code=400, detail=f"Job is {db_job.status}")
+    db_job.status = "queued"
+    db_job.error = None
+    db_job.finished_at = None
+    db.commit()
+    return job_status(db_job)
+
+@app.get("/admin/admission")
+def get_admission_stats():
+    """Concurrency, queue depth and rejection counts of the admission limits"""
+    return admission_stats()
+
+# Profiling endpoints
+@app.get("/admin/profiles")
+def list_profiles():
+    """List the most recent request profiles, newest first"""
+    return [profile.summary() for profile in reversed(get_profiles())]
+
+@app.get("/admin/profiles/{profile_id}")
+def get_profile_detail(profile_id: int):
+    """SQL log, repeated statement shapes and top functions for one profile"""
+    profile = get_profile(profile_id)
+    if not profile:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return profile.detail()
+
+@app.get("/admin/profiles/{profile_id}/download")
+def download_profile(profile_id: int):
+    """Download the raw profile, loadable with pstats or snakeviz"""
+    profile = get_profile(profile_id)
+    if not profile:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return Response(
+        content=profile.dump_stats(),
+        media_type="application/octet-stream",
+        headers={"Content-Disposition": f"attachment; filename=profile-{profile_id}.prof"}
+    )
 
 if __name__ == "__main__":
     import uvicorn
@@ -1,8 +1,23 @@
+import os
+
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
+from scipy.sparse import csr_matrix
 import numpy as np
 from models import Student, Internship, Match
 from base import SessionLocal
+from catalog import get_catalog
+from retrieval import ANN_MIN_CATALOG, get_minhash_index
+from student_features import load_features
+
+# calculate_match_score fits TF-IDF on just the two skill strings, so a token
+# present in both gets idf 1 and a token present in only one of them gets
+# idf ln(3/2) + 1. The vectorized scorer below relies on that closed form.
+UNSHARED_IDF = 1.0 + np.log(1.5)
+
+# Pending matches kept per student: the top TOP_K scoring at least MATCH_THRESHOLD
+MATCH_THRESHOLD = 0.5
+TOP_K = 3
 
 def calculate_match_score(student: Student, internship: Internship) -> float:
     """
@@ -43,36 +58,180 @@ def calculate_match_score(student: Student, internship: Internship) -> float:
 
     return min(1.0, score)  # Cap at 1.0
 
-def find_matches_for_student(student_id: int, threshold: float = 0.5):
+def score_students(features, catalog) -> np.ndarray:
     """
-    Find top 3 matches for a student above the threshold.
+    Score several students against every internship in a catalog snapshot.
+    Returns a (len(features), len(catalog)) array with the same values
+    calculate_match_score would produce for each pair.
     """
-    db = SessionLocal()
-    try:
-        student = db.query(Student).filter(Student.id == student_id).first()
-        if not student:
-            return []
+    scores = np.zeros((len(features), len(catalog)), dtype=np.float64)
+    if not features or not len(catalog):
+        return scores
+
+    # Student token counts over the catalog vocabulary. Tokens the catalog
+    # never uses can't be shared, but still count towards the student's norm.
+    indptr = [0]
+    indices = []
+    counts = []
+    for feature in features:
+        for token, count in feature.skill_counts.items():
+            column = catalog.token_index.get(token)
+            if column is not None:
+                indices.append(column)
+                counts.append(count)
+        indptr.append(len(indices))
+    student_skills = csr_matrix(
+        (np.asarray(counts, dtype=np.float64), np.asarray(indices, dtype=np.int32), indptr),
+        shape=(len(features), len(catalog.vocabulary))
+    )
+    student_presence = student_skills.copy()
+    student_presence.data = np.ones_like(student_presence.data)
+    student_squares = student_skills.multiply(student_skills).tocsr()
+
+    # Skills (40%): TF-IDF cosine similarity, with shared tokens weighted 1
+    # and unshared tokens weighted UNSHARED_IDF
+    dot = (student_skills @ catalog.skills.T).toarray()
+    shared_student_sq = (student_squares @ catalog.skill_presence.T).toarray()
+    shared_internship_sq = (student_presence @ catalog.skill_squares.T).toarray()
+    student_sq_norms = np.array([feature.skill_sq_norm for feature in features])[:, None]
+    weight_sq = UNSHARED_IDF ** 2
+    student_norms = weight_sq * student_sq_norms - (weight_sq - 1.0) * shared_student_sq
+    internship_norms = weight_sq * catalog.skill_sq_norms[None, :] - (weight_sq - 1.0) * shared_internship_sq
+    denominator = np.sqrt(np.maximum(student_norms, 0.0) * np.maximum(internship_norms, 0.0))
+    np.divide(dot, denominator, out=scores, where=denominator > 0)
+    scores *= 0.4
+
+    for row, feature in enumerate(features):
+        # CGPA (30%)
+        if feature.cgpa is not None:
+            eligible = feature.cgpa >= catalog.min_cgpa
+            scores[row, eligible] += feature.cgpa_score * 0.3
+
+        # Preferences (20%): domain appears in the student's preferences. As
+        # in calculate_match_score, an empty domain occurs in any of them.
+        if feature.preferences:
+            preferred = np.array([domain.lower() in feature.preferences for domain in catalog.domains])
+            scores[row, preferred[catalog.domain_codes]] += 0.2
+
+        # Resume quality (10%)
+        if feature.has_resume:
+            scores[row] += 0.1 * 0.1
+
+    return np.minimum(scores, 1.0, out=scores)
+
+
+def top_match_indices(scores: np.ndarray, threshold: float = 0.5, limit: int = 3) -> np.ndarray:
+    """
+    Row indices of the best `limit` scores at or above the threshold, best
+    first. Ties keep catalog (id) order, like a stable sort would.
+    """
+    candidates = np.flatnonzero(scores >= threshold)
+    if len(candidates) > limit:
+        cutoff = np.partition(scores[candidates], len(candidates) - limit)[len(candidates) - limit]
+        candidates = candidates[scores[candidates] >= cutoff]
+    order = np.argsort(-scores[candidates], kind="stable")
+    return candidates[order][:limit]
+
+
+# Upper bound on students x internships scored at once, to bound memory
+SCORE_BLOCK_CELLS = 2_000_000
+
+
+def iter_top_match_rows(features, catalog, threshold: float = 0.5, limit: int = 3):
+    """
+    Score many students and yield (features, row indices, scores) per student,
+    best first. Students are scored in blocks small enough that the score
+    matrices stay bounded however large the catalog is.
+    """
+    block = max(1, SCORE_BLOCK_CELLS // max(1, len(catalog)))
+    for start in range(0, len(features), block):
+        chunk = features[start:start + block]
+        scores = score_students(chunk, catalog)
+        for row, feature in enumerate(chunk):
+            indices = top_match_indices(scores[row], threshold, limit)
+            yield feature, indices, scores[row, indices]
+
+
+def top_matches(catalog, scores: np.ndarray, threshold: float = 0.5, limit: int = 3):
+    """Build match dicts for the best-scoring internships in one row of scores."""
+    matches = []
+    for index in top_match_indices(scores, threshold, limit):
+        match = catalog.record(index)
+        match["match_score"] = float(scores[index])
+        matches.append(match)
+    return matches
+
+
+# Catalog rows in the first step of iter_progressive_matches; each later
+# step is twice the size of the one before
+MATCH_STREAM_CHUNK = int(os.environ.get("MATCH_STREAM_CHUNK", "5000"))
+
+
+def iter_progressive_matches(features, catalog, threshold: float = 0.5, limit: int = 3,
+                             chunk_rows: int = MATCH_STREAM_CHUNK):
+    """
+    Score one student through the catalog chunk by chunk, yielding (rows
+    scored so far, best matches so far) after each chunk. Chunks double in
+    size, so the first result comes quickly without paying per-chunk
+    overhead many times over. The last yield is exactly top_matches() over
+    the whole catalog: each chunk's best are merged into the running best,
+    ties still going to the lower row.
+    """
+    if not len(catalog):
+        yield 0, []
+        return
+    best_rows = np.empty(0, dtype=np.int64)
+    best_scores = np.empty(0, dtype=np.float64)
+    start = 0
+    while start < len(catalog):
+        stop = min(start + chunk_rows, len(catalog))
+        scores = score_students([features], catalog.row_range(start, stop))[0]
+        indices = top_match_indices(scores, threshold, limit)
+        rows = np.concatenate([best_rows, indices + start])
+        merged = np.concatenate([best_scores, scores[indices]])
+        order = np.lexsort((rows, -merged))[:limit]
+        best_rows, best_scores = rows[order], merged[order]
 
-        internships = db.query(Internship).filter(Internship.is_active == True).all()
         matches = []
+        for row, score in zip(best_rows, best_scores):
+            match = catalog.record(row)
+            match["match_score"] = float(score)
+            matches.append(match)
+        yield stop, matches
+        start = stop
+        chunk_rows *= 2
+
+
+def candidate_catalog(features, min_catalog_version=None):
+    """
+    The catalog to score a student against: all of it, or for very large
+    catalogs the LSH candidates, to be reranked exactly instead of scoring
+    everything. Falls back to the whole catalog if no candidate is found.
+    """
+    catalog = get_catalog(min_catalog_version)
+    if len(catalog) >= ANN_MIN_CATALOG:
+        candidates = get_minhash_index(catalog).query(list(features.skill_counts))
+        if len(candidates):
+            catalog = catalog.take(candidates)
+    return catalog
+
 
-        for internship in internships:
-            score = calculate_match_score(student, internship)
-            if score >= threshold:
-                matches.append({
-                    "internship_id": internship.id,
-                    "title": internship.title,
-                    "description": internship.description,
-                    "required_skills": internship.required_skills,
-                    "domain": internship.domain,
-                    "match_score": score
-                })
-
-        # Sort by score descending and take top 3
-        matches.sort(key=lambda x: x["match_score"], reverse=True)
-        return matches[:3]
+def find_matches_for_student(student_id: int, threshold: float = 0.5, min_catalog_version=None):
+    """
+    Find top 3 matches for a student above the threshold, against a catalog
+    at least as new as min_catalog_version (see get_catalog).
+    """
+    db = SessionLocal()
+    try:
+        features = load_features(db, student_id)
     finally:
         db.close()
+    if features is None:
+        return []
+
+    catalog = candidate_catalog(features, min_catalog_version)
+    scores = score_students([features], catalog)[0]
+    return top_matches(catalog, scores, threshold)
 
 def save_match(student_id: int, internship_id: int, score: float):
     """
@@ -86,4 +245,23 @@ def save_match(student_id: int, internship_id: int, score: float):
         db.refresh(match)
         return match
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+def replace_matches(db, student_id: int, matches):
+    """
+    Make the student's pending Match rows equal the given matches: update
+    scores in place, insert new pairs and drop pending rows (including
+    duplicates) that are no longer among them. Does not commit.
+    """
+    wanted = {match["internship_id"]: match["match_score"] for match in matches}
+    db.flush()  # The session doesn't autoflush; earlier unflushed rows must be visible
+    pending = db.query(Match).filter(Match.student_id == student_id, Match.status == "pending").all()
+
+    for row in pending:
+        if row.internship_id in wanted:
+            row.match_score = wanted.pop(row.internship_id)
+        else:
+            db.delete(row)
+
+    for internship_id, score in wanted.items():
+        db.add(Match(student_id=student_id, internship_id=internship_id, match_score=score))
@@ -0,0 +1,64 @@
+"""
+In-place upgrades for existing databases.
+
+create_all() creates missing tables but never alters existing ones, so a
+database created by an older version lacks newer columns and indexes.
+upgrade() adds them, the full-text search index (see search.py) and the
+stored scoring features of students written before they existed (see
+student_features.py).
+"""
+
+from sqlalchemy import inspect, text
+
+from base import Base
+import models  # register every table on Base.metadata
+from search import ensure_search_index
+from student_features import ensure_student_features
+
+# (table, column, DDL type) added after the table was first created
+ADDED_COLUMNS = [
+    ("matches", "created_at", "TIMESTAMP"),
+]
+
+
+def upgrade(engine):
+    """Add any missing columns and indexes. Safe to run on every startup."""
+    inspector = inspect(engine)
+    tables = set(inspector.get_table_names())
+    changed = False
+    with engine.begin() as conn:
+        for table, column, ddl_type in ADDED_COLUMNS:
+            if table not in tables:
+                continue
+            existing = {info["name"] for info in inspector.get_columns(table)}
+            if column not in existing:
+                conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl_type}"))
+                changed = True
+
+        # Indexes declared on the models
+        for table in Base.metadata.sorted_tables:
+            if table.name not in tables:
+                continue
+            existing = {info["name"] for info in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in existing:
+                    index.create(conn)
+                    changed = True
+
+    if "internships" in tables and ensure_search_index(engine):
+        changed = True
+
+    if "students" in tables:
+        ensure_student_features(engine)
+
+    if changed and not is_memory_database(engine):
+        # Pooled SQLite connections opened before the change keep planning
+        # queries against the old schema; make every later query reconnect.
+        # An in-memory database lives only as long as its connection, so
+        # disposing it would throw the database away.
+        engine.dispose()
+
+
+def is_memory_database(engine) -> bool:
+    url = engine.url
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
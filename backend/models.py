@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, Float, Boolean, JSON, ForeignKey
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, Float, Boolean, JSON, ForeignKey, DateTime, LargeBinary, Index
 from sqlalchemy.orm import relationship
 from base import Base
 
@@ -16,11 +17,16 @@ class Student(Base):
     resume_url = Column(String, nullable=True)
     is_active = Column(Boolean, default=True)
 
+    __table_args__ = (
+        # Active-student keyset scans (rowid order comes free with the index)
+        Index("ix_students_active", "is_active"),
+    )
+
 class Internship(Base):
     __tablename__ = "internships"
 
     id = Column(Integer, primary_key=True, index=True)
-    employer_id = Column(Integer, ForeignKey("employers.id"))
+    employer_id = Column(Integer, ForeignKey("employers.id"), index=True)
     title = Column(String)
     description = Column(String)
     required_skills = Column(JSON)  # List of required skills
@@ -32,6 +38,11 @@ class Internship(Base):
 
     employer = relationship("Employer")
 
+    __table_args__ = (
+        # Catalog loads (active only), optionally narrowed by domain
+        Index("ix_internships_active_domain", "is_active", "domain"),
+    )
+
 class Employer(Base):
     __tablename__ = "employers"
 
@@ -49,7 +60,80 @@ class Match(Base):
     student_id = Column(Integer, ForeignKey("students.id"))
     internship_id = Column(Integer, ForeignKey("internships.id"))
     match_score = Column(Float)
-    status = Column(String, default="pending")  # pending, accepted, rejected
+    status = Column(String, default="pending")  # pending, accepted, rejected, allocated
+    created_at = Column(DateTime, default=datetime.utcnow)
 
     student = relationship("Student")
     internship = relationship("Internship")
+
+    __table_args__ = (
+        # A student's pending matches, cascades and compaction dedupe
+        Index("ix_matches_student_status_internship", "student_id", "status", "internship_id"),
+        # Students matched to an internship, allocation fill counts
+        Index("ix_matches_internship_status", "internship_id", "status"),
+        # Allocation walks pending matches by score descending
+        Index("ix_matches_status_score", "status", match_score.desc(), "id"),
+    )
+
+class StudentFeature(Base):
+    __tablename__ = "student_features"
+
+    student_id = Column(Integer, ForeignKey("students.id", ondelete="CASCADE"), primary_key=True)
+    version = Column(Integer)  # student_features.FEATURE_VERSION the record was written with
+    payload = Column(LargeBinary)  # orjson-encoded scoring features, see student_features.py
+
+class MatchArchive(Base):
+    __tablename__ = "match_archive"
+
+    id = Column(Integer, primary_key=True, index=True)
+    first_match_id = Column(Integer)
+    last_match_id = Column(Integer)
+    row_count = Column(Integer)
+    payload = Column(LargeBinary)  # zlib-compressed JSON list of archived match rows
+    archived_at = Column(DateTime, default=datetime.utcnow)
+
+class MatchChange(Base):
+    __tablename__ = "match_changes"
+
+    id = Column(Integer, primary_key=True, index=True)
+    entity_type = Column(String)  # internship, student
+    entity_id = Column(Integer)
+    cursor = Column(Integer, default=0)  # Last student id rescored by an internship sweep
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class Lease(Base):
+    __tablename__ = "leases"
+
+    name = Column(String, primary_key=True)  # What the lease guards, e.g. match_changes
+    holder = Column(String, nullable=True)  # host:pid of the process holding it
+    expires_at = Column(DateTime, nullable=True)  # Renewed by the holder while it works
+
+class Job(Base):
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String)  # recompute, export, allocation, compact
+    status = Column(String, default="queued")  # queued, running, completed, failed, cancelled
+    params = Column(JSON)
+    checkpoint = Column(JSON)  # Where to resume, e.g. {"after_id": 1200}
+    total = Column(Integer)
+    processed = Column(Integer, default=0)
+    worker = Column(String, nullable=True)
+    error = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    run_started_at = Column(DateTime, nullable=True)  # Start of the current (possibly resumed) run
+    run_start_processed = Column(Integer, default=0)
+    updated_at = Column(DateTime, nullable=True)  # Heartbeat, refreshed at every checkpoint
+    finished_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_jobs_status", "status", "id"),
+    )
+
+class TableRevision(Base):
+    __tablename__ = "table_revisions"
+
+    table_name = Column(String, primary_key=True)
+    revision = Column(Integer, default=0)  # Bumped by every transaction that writes the table
+    updated_at = Column(DateTime, default=datetime.utcnow)
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Resume parsing sidecar.
+
+The spaCy model is the largest part of an API worker's memory, and with one
+copy per worker it limits how many workers fit on a node. This process loads
+the model once and parses resumes for every worker on the host over a unix
+socket; with RESUME_PARSER_SOCKET set, resume_parser.parse_resume() sends
+the text here and the workers never load the model themselves.
+
+    python parser_service.py /run/internship/parser.sock
+    RESUME_PARSER_SOCKET=/run/internship/parser.sock uvicorn main:app --workers 4
+
+Messages in both directions are a 4-byte big-endian length followed by the
+payload: the resume text (UTF-8) in, and a JSON object out, either
+{"result": {...parsed fields...}} or {"error": "..."}.
+"""
+
+import os
+import socket
+import socketserver
+import sys
+import threading
+
+import orjson
+
+RESUME_PARSER_TIMEOUT = float(os.environ.get("RESUME_PARSER_TIMEOUT", "30"))
+MAX_MESSAGE_BYTES = 16 * 1024 * 1024
+
+
+def send_message(stream, payload: bytes):
+    stream.write(len(payload).to_bytes(4, "big") + payload)
+    stream.flush()
+
+
+def read_message(stream):
+    """The next message's payload, or None at end of stream."""
+    header = stream.read(4)
+    if len(header) < 4:
+        return None
+    length = int.from_bytes(header, "big")
+    if length > MAX_MESSAGE_BYTES:
+        raise ValueError(f"Message of {length} bytes exceeds {MAX_MESSAGE_BYTES}")
+    payload = stream.read(length)
+    if len(payload) < length:
+        return None
+    return payload
+
+
+def parse_remote(text: str, socket_path: str, timeout: float = RESUME_PARSER_TIMEOUT) -> dict:
+    """Have the sidecar listening on socket_path parse a resume."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(socket_path)
+        with sock.makefile("rwb") as stream:
+            send_message(stream, text.encode("utf-8"))
+            payload = read_message(stream)
+    if payload is None:
+        raise ConnectionError("Resume parser closed the connection")
+    response = orjson.loads(payload)
+    if "error" in response:
+        raise RuntimeError(response["error"])
+    return response["result"]
+
+
+class ParseHandler(socketserver.StreamRequestHandler):
+    """Serves parse requests on one connection until the client closes it."""
+
+    def handle(self):
+        while True:
+            try:
+                payload = read_message(self.rfile)
+            except ValueError as e:
+                send_message(self.wfile, orjson.dumps({"error": str(e)}))
+                return
+            if payload is None:
+                return
+            try:
+                # One parse at a time: spaCy holds the GIL anyway, and
+                # concurrent parses only grow the heap (one malloc arena per
+                # busy thread)
+                with self.server.parse_lock:
+                    result = self.server.parse(payload.decode("utf-8"))
+                response = {"result": result}
+            except Exception as e:
+                response = {"error": f"{type(e).__name__}: {e}"}
+            send_message(self.wfile, orjson.dumps(response))
+
+
+class ParserServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, parse):
+        if os.path.exists(socket_path):
+            os.remove(socket_path)  # Left behind by a previous run
+        self.parse = parse
+        self.parse_lock = threading.Lock()
+        super().__init__(socket_path, ParseHandler)
+
+
+def serve(socket_path: str, ready=None):
+    """Load the model in this process and serve parse requests forever."""
+    import resume_parser
+    if resume_parser.nlp is None:
+        resume_parser.nlp = resume_parser.load_model()
+    server = ParserServer(socket_path, resume_parser.parse_resume_locally)
+    if ready is not None:
+        ready.set()
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+
+
+def main():
+    socket_path = sys.argv[1] if len(sys.argv) > 1 else os.environ.get("RESUME_PARSER_SOCKET", "")
+    if not socket_path:
+        print("Usage: python parser_service.py SOCKET_PATH")
+        sys.exit(1)
+    print(f"Resume parser listening on {socket_path}")
+    try:
+        serve(socket_path)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
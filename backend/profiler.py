@@ -0,0 +1,214 @@
+"""
+Opt-in request profiler and N+1 query detector.
+
+A request is profiled when it carries the ``X-Profile: 1`` header, or at random
+with probability PROFILE_SAMPLE_RATE. For a profiled request we record a
+cProfile profile of the endpoint and every SQL statement it executed, and flag
+statement shapes that were executed over and over (the usual symptom of lazy
+relationship loads in a loop). The last PROFILE_HISTORY profiles are kept in
+memory for the /admin/profiles endpoints.
+"""
+
+import asyncio
+import contextvars
+import cProfile
+import functools
+import io
+import itertools
+import marshal
+import os
+import pstats
+import random
+import re
+import threading
+import time
+from collections import deque
+
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+
+PROFILE_HEADER = "x-profile"
+PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_HISTORY = int(os.environ.get("PROFILE_HISTORY", "20"))
+# A statement shape executed at least this many times in one request is flagged
+REPEATED_QUERY_THRESHOLD = int(os.environ.get("REPEATED_QUERY_THRESHOLD", "5"))
+
+_current_profile = contextvars.ContextVar("current_profile", default=None)
+_profiles = deque(maxlen=PROFILE_HISTORY)
+_profiles_lock = threading.Lock()
+_profile_ids = itertools.count(1)
+
+_WHITESPACE = re.compile(r"\s+")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+
+
+def statement_shape(statement: str) -> str:
+    """
+    Normalize a SQL statement so that queries differing only in their
+    parameters (or in the length of an IN list) compare equal.
+    """
+    shape = _WHITESPACE.sub(" ", statement).strip()
+    shape = _STRING_LITERAL.sub("?", shape)
+    shape = _NUMBER_LITERAL.sub("?", shape)
+    return _PLACEHOLDER_LIST.sub("(?)", shape)
+
+
+class RequestProfile:
+    """Profile and SQL log captured for a single request."""
+
+    def __init__(self, method: str, path: str):
+        self.id = next(_profile_ids)
+        self.method = method
+        self.path = path
+        self.started_at = time.time()
+        self.duration_ms = None
+        self.status_code = None
+        self.profiler = cProfile.Profile()
+        self.statements = []
+        self._lock = threading.Lock()
+
+    def record_statement(self, statement: str, parameters, duration_ms: float):
+        with self._lock:
+            self.statements.append({
+                "statement": statement,
+                "parameters": repr(parameters)[:500],
+                "duration_ms": round(duration_ms, 3)
+            })
+
+    def repeated_statements(self):
+        """Statement shapes executed at least REPEATED_QUERY_THRESHOLD times."""
+        shapes = {}
+        for entry in self.statements:
+            shape = statement_shape(entry["statement"])
+            stats = shapes.setdefault(shape, {"statement": shape, "count": 0, "total_ms": 0.0})
+            stats["count"] += 1
+            stats["total_ms"] += entry["duration_ms"]
+
+        repeated = [s for s in shapes.values() if s["count"] >= REPEATED_QUERY_THRESHOLD]
+        for stats in repeated:
+            stats["total_ms"] = round(stats["total_ms"], 3)
+        repeated.sort(key=lambda s: s["count"], reverse=True)
+        return repeated
+
+    def summary(self) -> dict:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "started_at": self.started_at,
+            "duration_ms": self.duration_ms,
+            "status_code": self.status_code,
+            "query_count": len(self.statements),
+            "sql_time_ms": round(sum(s["duration_ms"] for s in self.statements), 3),
+            "repeated_statements": len(self.repeated_statements())
+        }
+
+    def detail(self, limit: int = 40) -> dict:
+        return {
+            **self.summary(),
+            "repeated_statements": self.repeated_statements(),
+            "statements": self.statements,
+            "profile": self.stats_text(limit)
+        }
+
+    def stats_text(self, limit: int = 40) -> str:
+        """Top functions by cumulative time, as printed by pstats."""
+        stream = io.StringIO()
+        try:
+            stats = pstats.Stats(self.profiler, stream=stream)
+        except TypeError:
+            # Nothing was profiled (e.g. the request failed before the endpoint ran)
+            return ""
+        stats.sort_stats("cumulative").print_stats(limit)
+        return stream.getvalue()
+
+    def dump_stats(self) -> bytes:
+        """Raw profile in the format written by pstats.Stats.dump_stats."""
+        self.profiler.create_stats()
+        return marshal.dumps(self.profiler.stats)
+
+
+def get_profiles():
+    with _profiles_lock:
+        return list(_profiles)
+
+
+def get_profile(profile_id: int):
+    with _profiles_lock:
+        for profile in _profiles:
+            if profile.id == profile_id:
+                return profile
+    return None
+
+
+def _should_profile(request) -> bool:
+    if request.headers.get(PROFILE_HEADER, "").lower() in ("1", "true", "yes"):
+        return True
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+
+async def profiling_middleware(request, call_next):
+    """HTTP middleware that profiles opted-in requests."""
+    if request.url.path.startswith("/admin/profiles") or not _should_profile(request):
+        return await call_next(request)
+
+    profile = RequestProfile(request.method, request.url.path)
+    token = _current_profile.set(profile)
+    start = time.perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        _current_profile.reset(token)
+        profile.duration_ms = round((time.perf_counter() - start) * 1000, 3)
+        with _profiles_lock:
+            _profiles.append(profile)
+
+    profile.status_code = response.status_code
+    response.headers["X-Profile-Id"] = str(profile.id)
+    return response
+
+
+def _profiled(call):
+    """Run a sync endpoint under the current request's profiler, if any."""
+    @functools.wraps(call)
+    def wrapper(*args, **kwargs):
+        profile = _current_profile.get()
+        if profile is None:
+            return call(*args, **kwargs)
+        # Sync endpoints run in the threadpool, so the profiler has to be
+        # enabled in the worker thread rather than in the middleware
+        profile.profiler.enable()
+        try:
+            return call(*args, **kwargs)
+        finally:
+            profile.profiler.disable()
+    return wrapper
+
+
+class ProfiledRoute(APIRoute):
+    """APIRoute that lets the profiler see into sync endpoint functions."""
+
+    def get_route_handler(self):
+        if not asyncio.iscoroutinefunction(self.dependant.call):
+            self.dependant.call = _profiled(self.dependant.call)
+        return super().get_route_handler()
+
+
+def install_sql_logging(engine):
+    """Attach statement timing to the engine; only profiled requests pay for the log."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if _current_profile.get() is not None:
+            conn.info.setdefault("profile_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        profile = _current_profile.get()
+        starts = conn.info.get("profile_query_start")
+        if profile is None or not starts:
+            return
+        duration_ms = (time.perf_counter() - starts.pop()) * 1000
+        profile.record_statement(statement, parameters, duration_ms)
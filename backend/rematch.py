@@ -0,0 +1,282 @@
+"""
+Incremental re-matching driven by a durable change log.
+
+Writes to students and internships record a MatchChange row in the same
+transaction. A sweep later drains the log, coalescing repeated edits of the
+same entity, and propagates each change to the persisted pending matches:
+
+- a changed student is rescored against the whole catalog;
+- a changed internship is scored alone against every active student, and
+  only students whose top matches it enters, leaves or reorders are touched.
+
+Internship sweeps save their position (the last student id processed) after
+every chunk, so a sweep interrupted by a crash resumes where it stopped.
+
+Every API worker process triggers sweeps, so only the holder of the
+match_changes lease (a row in leases, claimed atomically) sweeps; the others
+leave the log to it. The holder renews the lease in the transaction of every
+commit, so if it ever loses the lease its writes roll back instead of racing
+the new holder's. A lease whose holder died expires after SWEEP_LEASE_SECONDS.
+
+Sweeps score against a catalog at least as new as the changes they drain,
+since another worker may have written them. An internship missing from the
+catalog is only treated as deleted if the database agrees.
+"""
+
+import os
+import socket
+import threading
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, select, update, or_
+from sqlalchemy.exc import IntegrityError
+
+from models import Student, Internship, Match, MatchChange, Lease
+from base import SessionLocal
+from catalog import get_catalog
+from matching import score_students, top_matches, replace_matches, MATCH_THRESHOLD, TOP_K
+from student_features import load_features, load_student_features
+from revisions import table_revision
+
+STUDENT_CHUNK_SIZE = 500
+SWEEP_LEASE = "match_changes"
+SWEEP_LEASE_SECONDS = int(os.environ.get("SWEEP_LEASE_SECONDS", "60"))
+
+_sweep_lock = threading.Lock()
+_sweep_requested = threading.Event()
+
+
+def record_change(db, entity_type: str, entity_id: int):
+    """Log a change to propagate; commit it together with the write itself."""
+    db.add(MatchChange(entity_type=entity_type, entity_id=entity_id))
+
+
+class LeaseLost(Exception):
+    """Another process took over the sweep lease."""
+
+
+class CatalogBehind(Exception):
+    """The catalog snapshot lacks an active internship; the sweep is retried later."""
+
+
+def process_changes():
+    """
+    Drain the change log. Safe to call from many threads and processes at
+    once: if a sweep is already running, here or in another process, it
+    picks up the new changes before it finishes.
+    """
+    _sweep_requested.set()
+    while _sweep_requested.is_set():
+        if not _sweep_lock.acquire(blocking=False):
+            return
+        try:
+            _sweep_requested.clear()
+            _sweep_under_lease()
+        finally:
+            _sweep_lock.release()
+
+
+def _holder() -> str:
+    # Not cached: workers forked from a preloading master get their own pid
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _sweep_under_lease():
+    db = SessionLocal()
+    try:
+        while _acquire_lease(db):
+            try:
+                while _process_next_batch():
+                    pass
+            except (LeaseLost, CatalogBehind):
+                return
+            finally:
+                _release_lease(db)
+            # A change logged while the lease was being released found it
+            # taken and left the log to us: look once more
+            if db.query(MatchChange.id).first() is None:
+                return
+    finally:
+        db.close()
+
+
+def _acquire_lease(db) -> bool:
+    """Claim the sweep lease if it is free, expired or already ours."""
+    now = datetime.utcnow()
+    values = {"holder": _holder(), "expires_at": now + timedelta(seconds=SWEEP_LEASE_SECONDS)}
+    claimed = db.execute(
+        update(Lease)
+        .where(Lease.name == SWEEP_LEASE,
+               or_(Lease.holder == None, Lease.holder == values["holder"], Lease.expires_at < now))
+        .values(**values)
+    ).rowcount == 1
+    if not claimed and db.query(Lease.name).filter(Lease.name == SWEEP_LEASE).first() is None:
+        db.add(Lease(name=SWEEP_LEASE, **values))
+        try:
+            db.commit()
+        except IntegrityError:
+            # Another process created it first
+            db.rollback()
+            return False
+        return True
+    db.commit()
+    return claimed
+
+
+def _renew_lease(db):
+    """Extend the lease in the current transaction; raises LeaseLost if it isn't ours any more."""
+    renewed = db.execute(
+        update(Lease)
+        .where(Lease.name == SWEEP_LEASE, Lease.holder == _holder())
+        .values(expires_at=datetime.utcnow() + timedelta(seconds=SWEEP_LEASE_SECONDS))
+    ).rowcount == 1
+    if not renewed:
+        db.rollback()
+        raise LeaseLost()
+
+
+def _release_lease(db):
+    db.rollback()
+    db.execute(
+        update(Lease)
+        .where(Lease.name == SWEEP_LEASE, Lease.holder == _holder())
+        .values(holder=None, expires_at=None)
+    )
+    db.commit()
+
+
+def _process_next_batch() -> bool:
+    """Process every change currently in the log. Returns False if it was empty."""
+    db = SessionLocal()
+    try:
+        changes = db.query(MatchChange).order_by(MatchChange.id).all()
+        if not changes:
+            return False
+
+        # Coalesce: keep only the newest change per entity. Its cursor is the
+        # only progress worth resuming, since any older sweep is now outdated.
+        latest = {}
+        for change in changes:
+            key = (change.entity_type, change.entity_id)
+            if key in latest:
+                db.delete(latest[key])
+            latest[key] = change
+        _renew_lease(db)
+        db.commit()
+
+        # Read after the changes, so it covers every write they record: the
+        # catalog must include those, however recently the last check ran
+        catalog = get_catalog(min_version=table_revision(db, "internships"))
+        for change in sorted(latest.values(), key=lambda c: c.id):
+            if change.entity_type == "student":
+                _sweep_student(db, change, catalog)
+            elif change.entity_type == "internship":
+                _sweep_internship(db, change, catalog)
+            db.delete(change)
+            _renew_lease(db)
+            db.commit()
+        return True
+    finally:
+        db.close()
+
+
+def _sweep_student(db, change, catalog):
+    features = load_features(db, change.entity_id)
+    if features is None:
+        replace_matches(db, change.entity_id, [])
+        return
+    scores = score_students([features], catalog)[0]
+    replace_matches(db, change.entity_id, top_matches(catalog, scores, MATCH_THRESHOLD, TOP_K))
+
+
+def _rescore_students(db, features, catalog):
+    """Full rescore for students whose top matches can't be patched locally."""
+    if not features:
+        return
+    scores = score_students(features, catalog)
+    for row, feature in enumerate(features):
+        replace_matches(db, feature.student_id, top_matches(catalog, scores[row], MATCH_THRESHOLD, TOP_K))
+
+
+def _sweep_internship(db, change, catalog):
+    internship_id = change.entity_id
+    row = catalog.row_of(internship_id)
+    if row is None:
+        active = db.query(Internship.id).filter(
+            Internship.id == internship_id, Internship.is_active == True
+        ).first()
+        if active is not None:
+            # Written after the snapshot was taken, not deleted: use a newer
+            # one, or keep the change for a later sweep rather than lose it
+            catalog = get_catalog(min_version=table_revision(db, "internships"))
+            row = catalog.row_of(internship_id)
+            if row is None:
+                raise CatalogBehind()
+
+    if row is None:
+        # Deleted or deactivated: only students currently matched to it change
+        affected = load_student_features(db, Student.id.in_(
+            select(Match.student_id).where(Match.internship_id == internship_id, Match.status == "pending")
+        ))
+        _rescore_students(db, affected, catalog)
+        if db.query(Internship.id).filter(Internship.id == internship_id).first() is None:
+            # Deleted: cascade to its remaining (non-pending) matches. Done
+            # here rather than in the delete itself, since the pending rows
+            # are what identifies the affected students above.
+            db.execute(delete(Match).where(Match.internship_id == internship_id))
+        return
+
+    single = catalog.take([row])
+    while True:
+        features = load_student_features(
+            db, Student.is_active == True, Student.id > (change.cursor or 0), limit=STUDENT_CHUNK_SIZE
+        )
+        if not features:
+            return
+
+        new_scores = score_students(features, single)[:, 0]
+
+        current = defaultdict(dict)
+        pending = db.query(Match).filter(
+            Match.student_id.in_([feature.student_id for feature in features]),
+            Match.status == "pending"
+        )
+        for match in pending:
+            current[match.student_id][match.internship_id] = match.match_score
+
+        needs_rescore = []
+        for feature, score in zip(features, new_scores):
+            score = float(score)
+            matched = current[feature.student_id]
+            if internship_id in matched:
+                if score >= matched[internship_id]:
+                    # Still in the top k; only its score (and rank) changed
+                    matched[internship_id] = score
+                    _patch_matches(db, feature.student_id, matched)
+                else:
+                    # It may have fallen out of the top k: need the full catalog
+                    needs_rescore.append(feature)
+            elif score >= MATCH_THRESHOLD:
+                if len(matched) < TOP_K:
+                    # Fewer than k rows may just mean the student was never
+                    # matched, so the rest of their top k is unknown
+                    needs_rescore.append(feature)
+                elif score > min(matched.values()):
+                    matched[internship_id] = score
+                    _patch_matches(db, feature.student_id, matched)
+
+        _rescore_students(db, needs_rescore, catalog)
+
+        # Checkpoint: matches for this chunk and the cursor commit together
+        change.cursor = features[-1].student_id
+        _renew_lease(db)
+        db.commit()
+
+
+def _patch_matches(db, student_id: int, scores: dict):
+    """Keep the best TOP_K of the given internship -> score map."""
+    best = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:TOP_K]
+    replace_matches(db, student_id, [
+        {"internship_id": internship_id, "match_score": score} for internship_id, score in best
+    ])
@@ -1,13 +1,50 @@
-import spacy
+import os
 import re
 from typing import Dict, List
 
+from resume_segmenter import KeywordMatcher, ResumeSegments, segment_resume
+from parser_service import parse_remote
+
+RESUME_PARSER_MODEL = os.environ.get("RESUME_PARSER_MODEL", "en_core_web_sm")
+# Unix socket of the parsing sidecar (parser_service.py). When set, resumes are
+# parsed there and this process never loads the model.
+RESUME_PARSER_SOCKET = os.environ.get("RESUME_PARSER_SOCKET", "")
+
+def load_model(name: str = RESUME_PARSER_MODEL):
+    """Load the spaCy pipeline, or return None if it isn't installed."""
+    # Imported here: with a sidecar, API workers don't need spaCy at all
+    import spacy
+    try:
+        return spacy.load(name)
+    except OSError:
+        print(f"Warning: spaCy model '{name}' not found. Please run: python -m spacy download {name}")
+        return None
+
 # Load spaCy model (ensure 'en_core_web_sm' is installed)
-try:
-    nlp = spacy.load("en_core_web_sm")
-except OSError:
-    print("Warning: spaCy model 'en_core_web_sm' not found. Please run: python -m spacy download en_core_web_sm")
-    nlp = None
+nlp = None if RESUME_PARSER_SOCKET else load_model()
+
+# Compiled once at import rather than on every call
+CGPA_PATTERN = re.compile(r'(\d+\.\d+)(?:/(\d+\.\d+))?')
+EMAIL_PATTERN = re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b')
+YEAR_PATTERNS = [
+    re.compile(r'(\d{4})\s*-\s*(\d{4})', re.IGNORECASE),  # 2019-2023
+    re.compile(r'(\d{4})\s*-\s*Present', re.IGNORECASE),   # 2020-Present
+    re.compile(r'(\d{4})\s*-\s*Current', re.IGNORECASE),   # 2021-Current
+    re.compile(r'(\d{4})\s*to\s*(\d{4})', re.IGNORECASE),  # 2019 to 2023
+]
+YEAR_PATTERN = re.compile(r'\b(20\d{2})\b')
+
+DEGREE_KEYWORDS = frozenset(["bachelor", "master", "phd", "b.tech", "m.tech", "bsc", "msc", "ba", "ma"])
+NON_SKILL_WORDS = frozenset(["name", "email", "phone", "address"])
+BULLETS = ('•', '-', '*')
+
+# Sentences mentioning any of these are mined for interests when a resume
+# has no interests section
+INTEREST_WORDS = KeywordMatcher((word, word) for word in [
+    "passionate", "interested in", "enthusiastic", "love",
+    "enjoy", "fascinated", "dedicated to", "committed to"
+])
+CONTACT_WORDS = KeywordMatcher((word, word) for word in ["email", "phone", "address", "name"])
 
 def extract_text_from_pdf(file_path: str) -> str:
     """
@@ -38,6 +75,14 @@ def parse_resume(text: str) -> Dict:
     """
     Parse resume text to extract name, degree, CGPA, skills.
     """
+    if RESUME_PARSER_SOCKET:
+        return parse_remote(text, RESUME_PARSER_SOCKET)
+    return parse_resume_locally(text)
+
+def parse_resume_locally(text: str) -> Dict:
+    """
+    Parse with this process's model (single-process setups and the sidecar).
+    """
     if nlp is None:
         return {
             "full_name": "",
@@ -50,6 +95,7 @@ def parse_resume(text: str) -> Dict:
         }
 
     doc = nlp(text)
+    segments = segment_resume(text)
 
     # Extract name (first proper noun entity)
     name = ""
@@ -59,15 +105,14 @@ def parse_resume(text: str) -> Dict:
             break
 
     # Extract degree (look for common degree keywords)
-    degree_keywords = ["bachelor", "master", "phd", "b.tech", "m.tech", "bsc", "msc", "ba", "ma"]
     degree = ""
     for token in doc:
-        if token.text.lower() in degree_keywords:
+        if token.text.lower() in DEGREE_KEYWORDS:
             degree = token.text
             break
 
     # Extract CGPA (regex for numbers like 8.5 or 3.5/4.0)
-    cgpa_match = re.search(r'(\d+\.\d+)(?:/(\d+\.\d+))?', text)
+    cgpa_match = CGPA_PATTERN.search(text)
     cgpa = float(cgpa_match.group(1)) if cgpa_match else None
 
     # Extract skills (nouns and proper nouns that might be skills)
@@ -78,16 +123,16 @@ def parse_resume(text: str) -> Dict:
 
     # Remove duplicates and common words
     skills = list(set(skills))
-    skills = [skill for skill in skills if skill not in ["name", "email", "phone", "address"]]
+    skills = [skill for skill in skills if skill not in NON_SKILL_WORDS]
 
-    # Extract preferences and interests
-    preferences = extract_preferences(text)
+    # Extract preferences and interests (reusing the parsed doc)
+    preferences = extract_preferences(segments, doc)
 
     # Extract email address
-    email = extract_email(text)
+    email = extract_email(segments)
 
     # Extract year of study
-    year_of_study = extract_year_of_study(text)
+    year_of_study = extract_year_of_study(segments)
 
     return {
         "full_name": name,
@@ -99,7 +144,7 @@ def parse_resume(text: str) -> Dict:
         "preferences": preferences
     }
 
-def extract_preferences(text: str) -> List[str]:
+def extract_preferences(segments: ResumeSegments, doc=None) -> List[str]:
     """
     Extract preferences and interests from resume text.
     Looks for sections like INTERESTS, HOBBIES, PREFERENCES, etc.
@@ -109,55 +154,30 @@ def extract_preferences(text: str) -> List[str]:
 
     preferences = []
 
-    # Common section headers for interests/preferences
-    interest_headers = [
-        "interests", "hobbies", "preferences", "personal interests",
-        "areas of interest", "passionate about", "enthusiastic about",
-        "activities", "extracurricular", "volunteer work"
-    ]
-
-    # Convert text to lowercase for case-insensitive matching
-    text_lower = text.lower()
-    lines = text.split('\n')
-
-    # Find interest sections
-    interest_section_found = False
-    for line in lines:
-        line_lower = line.lower().strip()
-
-        # Check if this line contains an interest header
-        if any(header in line_lower for header in interest_headers):
-            interest_section_found = True
-            continue
-
-        # If we're in an interest section, extract meaningful content
-        if interest_section_found:
-            # Stop if we hit another major section
-            if any(section in line_lower for section in [
-                "education", "experience", "skills", "projects",
-                "certifications", "achievements", "professional summary"
-            ]):
+    # Lines after the first interests header, up to the next other section
+    # header; further interest headers are skipped
+    start = segments.first_line.get("interests")
+    if start is not None:
+        for index in range(start + 1, len(segments.lines)):
+            kinds = segments.kinds(index)
+            if "interests" in kinds:
+                continue
+            if kinds:
                 break
 
             # Skip empty lines and bullet points
-            if line.strip() and not line.strip().startswith(('•', '-', '*')):
-                # Clean up the line and extract meaningful preferences
-                cleaned_line = line.strip()
-                if cleaned_line and len(cleaned_line) > 3:
-                    preferences.append(cleaned_line)
+            cleaned_line = segments.lines[index].strip()
+            if cleaned_line and not cleaned_line.startswith(BULLETS) and len(cleaned_line) > 3:
+                preferences.append(cleaned_line)
 
     # If no dedicated section found, try to extract from the entire text
     if not preferences:
-        doc = nlp(text)
+        if doc is None:
+            doc = nlp(segments.text)
 
         # Look for sentences that might indicate interests
         for sent in doc.sents:
-            sent_text = sent.text.lower()
-            # Look for sentences containing interest-related keywords
-            if any(word in sent_text for word in [
-                "passionate", "interested in", "enthusiastic", "love",
-                "enjoy", "fascinated", "dedicated to", "committed to"
-            ]):
+            if INTEREST_WORDS.contains_any(sent.text.lower()):
                 # Extract nouns and proper nouns from these sentences
                 for token in sent:
                     if token.pos_ in ["NOUN", "PROPN"] and len(token.text) > 2:
@@ -166,64 +186,33 @@ def extract_preferences(text: str) -> List[str]:
     # Clean up preferences
     preferences = list(set(preferences))  # Remove duplicates
     preferences = [pref for pref in preferences if len(pref) > 2]  # Remove very short items
-    preferences = [pref for pref in preferences if not any(
-        word in pref.lower() for word in ["email", "phone", "address", "name"]
-    )]  # Remove contact info
+    preferences = [pref for pref in preferences if not CONTACT_WORDS.contains_any(pref.lower())]  # Remove contact info
 
     return preferences[:8]  # Limit to top 8 preferences
 
-def extract_email(text: str) -> str:
+def extract_email(segments: ResumeSegments) -> str:
     """
     Extract email address from resume text using regex.
     """
-    import re
+    match = EMAIL_PATTERN.search(segments.text)
+    return match.group() if match else ""
 
-    # Email regex pattern
-    email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-
-    # Find all email addresses in the text
-    emails = re.findall(email_pattern, text)
-
-    # Return the first email found, or empty string if none
-    return emails[0] if emails else ""
-
-def extract_year_of_study(text: str) -> str:
+def extract_year_of_study(segments: ResumeSegments) -> str:
     """
     Extract year of study from education section.
     Looks for patterns like "2019-2023", "2020-Present", etc.
     """
-    import re
-
-    # Common year patterns in education sections
-    year_patterns = [
-        r'(\d{4})\s*-\s*(\d{4})',  # 2019-2023
-        r'(\d{4})\s*-\s*Present',   # 2020-Present
-        r'(\d{4})\s*-\s*Current',   # 2021-Current
-        r'(\d{4})\s*to\s*(\d{4})',  # 2019 to 2023
-        r'(\d{4})\s*-\s*(\d{4})',  # 2019-2023 (repeated for completeness)
-    ]
-
-    # Look for education section
-    text_lower = text.lower()
-    education_start = -1
-
-    # Find where education section starts
-    for i, line in enumerate(text.split('\n')):
-        if 'education' in line.lower():
-            education_start = i
-            break
-
-    if education_start == -1:
+    education_start = segments.first_line.get("education")
+    if education_start is None:
         # If no education section found, search entire text
-        search_text = text
+        search_text = segments.text
     else:
         # Search from education section onwards
-        lines = text.split('\n')
-        search_text = '\n'.join(lines[education_start:education_start+10])  # Next 10 lines
+        search_text = '\n'.join(segments.lines[education_start:education_start+10])  # Next 10 lines
 
     # Try each pattern
-    for pattern in year_patterns:
-        match = re.search(pattern, search_text, re.IGNORECASE)
+    for pattern in YEAR_PATTERNS:
+        match = pattern.search(search_text)
         if match:
             if len(match.groups()) == 2:
                 start_year, end_year = match.groups()
@@ -233,7 +222,7 @@ def extract_year_of_study(text: str) -> str:
                 return match.group()
 
     # If no pattern found, try to find individual years
-    year_matches = re.findall(r'\b(20\d{2})\b', search_text)
+    year_matches = YEAR_PATTERN.findall(search_text)
     if year_matches:
         # Return the most recent year or year range
         if len(year_matches) >= 2:
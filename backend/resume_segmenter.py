@@ -0,0 +1,94 @@
+"""
+Single-pass resume segmentation.
+
+segment_resume() lowercases the resume once and locates every section keyword
+in the whole text at once, instead of each extractor re-splitting the text
+and testing keyword lists against every line. The result records which
+section kinds (education, skills, interests, experience, ...) each line
+mentions and the first line mentioning each kind; the extractors in
+resume_parser.py read from it.
+"""
+
+# Keywords whose presence in a line marks it as that section's header.
+# Matching is by substring of the lowercased line, like `keyword in line`.
+SECTION_KEYWORDS = {
+    "interests": [
+        "interests", "hobbies", "preferences", "personal interests",
+        "areas of interest", "passionate about", "enthusiastic about",
+        "activities", "extracurricular", "volunteer work"
+    ],
+    "education": ["education"],
+    "experience": ["experience"],
+    "skills": ["skills"],
+    "projects": ["projects"],
+    "certifications": ["certifications"],
+    "achievements": ["achievements"],
+    "summary": ["professional summary"],
+}
+
+
+class KeywordMatcher:
+    """
+    Finds which of a fixed set of keywords occur in a string. Each keyword is
+    located with str.find, CPython's C substring search, which on resume-sized
+    text beats a character-by-character automaton (Aho-Corasick) written in
+    Python by several times; benchmarks/resume_parse.py measures it.
+    Overlapping occurrences are all found, like testing `keyword in text`.
+    """
+
+    def __init__(self, keywords):
+        """keywords: iterable of (keyword, label) pairs."""
+        self.keywords = list(keywords)
+
+    def finditer(self, text: str):
+        """(position, label) of every keyword occurrence, in text order."""
+        hits = []
+        for keyword, label in self.keywords:
+            position = text.find(keyword)
+            while position != -1:
+                hits.append((position, label))
+                position = text.find(keyword, position + 1)
+        hits.sort()
+        return hits
+
+    def contains_any(self, text: str) -> bool:
+        return any(keyword in text for keyword, _ in self.keywords)
+
+
+SECTION_MATCHER = KeywordMatcher(
+    (keyword, kind) for kind, keywords in SECTION_KEYWORDS.items() for keyword in keywords
+)
+_NO_KINDS = frozenset()
+
+
+class ResumeSegments:
+    """Lines of a resume and the section kinds each line mentions."""
+
+    def __init__(self, text: str):
+        self.text = text
+        self.lines = text.split("\n")
+
+        # Line index -> section kinds it mentions, for the (few) lines that
+        # mention any. One keyword scan over the whole lowercased text;
+        # lower() never adds or removes newlines, so line numbers carry over.
+        lowered = text.lower()
+        self.line_kinds = {}
+        line = previous = 0
+        for position, kind in SECTION_MATCHER.finditer(lowered):
+            line += lowered.count("\n", previous, position)
+            previous = position
+            self.line_kinds.setdefault(line, set()).add(kind)
+
+        # First line mentioning each kind (line_kinds is in line order)
+        self.first_line = {}
+        for index, kinds in self.line_kinds.items():
+            for kind in kinds:
+                self.first_line.setdefault(kind, index)
+
+    def kinds(self, index: int):
+        """Section kinds mentioned by the line at index (empty for body lines)."""
+        return self.line_kinds.get(index, _NO_KINDS)
+
+
+def segment_resume(text: str) -> ResumeSegments:
+    return ResumeSegments(text)
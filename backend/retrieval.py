@@ -0,0 +1,159 @@
+"""
+Approximate candidate retrieval for very large catalogs.
+
+Scoring a student against every internship is linear in the catalog size. For
+catalogs with hundreds of thousands of postings we first retrieve a few hundred
+candidates whose required-skill token sets are similar to the student's, using
+MinHash signatures and banded locality-sensitive hashing, and score only those
+exactly. Bucket lookups are binary searches over sorted band keys, so a query
+costs O(bands * log n) plus the size of the buckets it hits.
+
+Only skills drive retrieval; CGPA and domain preference are applied when the
+candidates are reranked. benchmarks/retrieval_recall.py measures recall@k of
+this path against exact scoring.
+
+Building the index takes seconds and hundreds of MB at these sizes, so it is
+built once, when a shared snapshot file is published (snapshot_store.py), and
+stored in the file next to the catalog; workers map it like the rest of the
+snapshot. Only private snapshots build their index in-process, on first use.
+"""
+
+import os
+import threading
+import weakref
+import zlib
+
+import numpy as np
+
+# Catalogs at least this large use approximate retrieval in find_matches_for_student
+ANN_MIN_CATALOG = int(os.environ.get("ANN_MIN_CATALOG", "200000"))
+ANN_CANDIDATES = int(os.environ.get("ANN_CANDIDATES", "500"))
+
+_PRIME = (1 << 31) - 1
+_SIGNATURE_BLOCK = 8192  # catalog rows hashed at a time while building
+
+
+def _scramble(rows: np.ndarray) -> np.ndarray:
+    """A 31-bit hash of each row number (Fibonacci hashing)."""
+    return (rows.astype(np.uint64) * np.uint64(0x9E3779B97F4A7C15)) >> np.uint64(33)
+
+
+def _token_hashes(tokens) -> np.ndarray:
+    return np.array([zlib.crc32(token.encode("utf-8")) & _PRIME for token in tokens], dtype=np.int64)
+
+
+class MinHashIndex:
+    """
+    Banded MinHash LSH over the required-skill tokens of a catalog snapshot.
+    The hash permutations follow from (bands, rows_per_band, seed), so an
+    index is fully described by those and its three arrays (see arrays()).
+    """
+
+    def __init__(self, catalog=None, bands: int = 24, rows_per_band: int = 3, seed: int = 7, arrays=None):
+        self.bands = bands
+        self.rows_per_band = rows_per_band
+        self.seed = seed
+        num_perm = bands * rows_per_band
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(1, _PRIME, num_perm, dtype=np.int64)
+        self.b = rng.integers(0, _PRIME, num_perm, dtype=np.int64)
+        if arrays is not None:
+            # Stored by an earlier build, e.g. mapped from a snapshot file
+            self.rows, self.sorted_keys, self.sorted_rows = arrays
+            return
+
+        # Permuted hash of every vocabulary token, shape (num_perm, vocabulary)
+        vocabulary_hashes = self._permute(_token_hashes(catalog.vocabulary))
+
+        # Internships without skill tokens can't be retrieved by skills
+        skills = catalog.skills
+        lengths = np.diff(skills.indptr)
+        self.rows = np.flatnonzero(lengths > 0).astype(np.int32)
+
+        signatures = np.empty((len(self.rows), num_perm), dtype=np.int64)
+        for start in range(0, len(self.rows), _SIGNATURE_BLOCK):
+            block = self.rows[start:start + _SIGNATURE_BLOCK]
+            block_skills = skills[block]
+            values = vocabulary_hashes[:, block_skills.indices]
+            signatures[start:start + len(block)] = np.minimum.reduceat(
+                values, block_skills.indptr[:-1], axis=1
+            ).T
+
+        # One sorted key array per band; lookups are binary searches
+        keys = self._band_keys(signatures)
+        order = np.argsort(keys, axis=0, kind="stable")
+        self.sorted_keys = np.take_along_axis(keys, order, axis=0).T.copy()
+        self.sorted_rows = self.rows[order].T.copy()
+
+    @property
+    def params(self) -> dict:
+        return {"bands": self.bands, "rows_per_band": self.rows_per_band, "seed": self.seed}
+
+    def arrays(self) -> tuple:
+        """(rows, sorted_keys, sorted_rows): with params, everything needed to rebuild the index."""
+        return self.rows, self.sorted_keys, self.sorted_rows
+
+    def _permute(self, hashes: np.ndarray) -> np.ndarray:
+        return (self.a[:, None] * hashes[None, :] + self.b[:, None]) % _PRIME
+
+    def _band_keys(self, signatures: np.ndarray) -> np.ndarray:
+        """Collapse each band of a signature into one 64-bit key, shape (n, bands)."""
+        banded = signatures.reshape(len(signatures), self.bands, self.rows_per_band).astype(np.uint64)
+        keys = np.zeros(banded.shape[:2], dtype=np.uint64)
+        for column in range(self.rows_per_band):
+            keys = keys * np.uint64(1000003) ^ banded[:, :, column]
+        return keys
+
+    def query(self, tokens, limit: int = ANN_CANDIDATES) -> np.ndarray:
+        """
+        Catalog rows of up to `limit` internships whose skills are likely to
+        overlap the given tokens, in catalog (id) order.
+        """
+        if not tokens or not len(self.rows):
+            return np.empty(0, dtype=np.int64)
+
+        signature = self._permute(_token_hashes(tokens)).min(axis=1)
+        keys = self._band_keys(signature[None, :])[0]
+
+        # Whole buckets: cutting one short would keep its lowest row ids,
+        # not its most similar rows
+        hits = []
+        for band in range(self.bands):
+            band_keys = self.sorted_keys[band]
+            start = np.searchsorted(band_keys, keys[band], side="left")
+            end = np.searchsorted(band_keys, keys[band], side="right")
+            if end > start:
+                hits.append(self.sorted_rows[band, start:end])
+        if not hits:
+            return np.empty(0, dtype=np.int64)
+
+        # Rank by how many bands collided, which estimates Jaccard similarity.
+        # Ties are broken in a fixed pseudo-random order rather than by row,
+        # which would favor older internships.
+        rows, collisions = np.unique(np.concatenate(hits), return_counts=True)
+        if len(rows) > limit:
+            rank = (collisions.astype(np.uint64) << np.uint64(32)) | _scramble(rows)
+            rows = rows[np.argpartition(rank, len(rows) - limit)[-limit:]]
+        return np.sort(rows).astype(np.int64)
+
+
+_indexes = weakref.WeakKeyDictionary()
+_indexes_lock = threading.Lock()
+
+
+def set_minhash_index(catalog, index: MinHashIndex):
+    """Use a prebuilt index (e.g. one mapped with the snapshot) for a catalog snapshot."""
+    with _indexes_lock:
+        _indexes[catalog] = index
+
+
+def get_minhash_index(catalog) -> MinHashIndex:
+    """The index for a catalog snapshot: the one stored with it, else built once per snapshot."""
+    index = _indexes.get(catalog)
+    if index is None:
+        with _indexes_lock:
+            index = _indexes.get(catalog)
+            if index is None:
+                index = MinHashIndex(catalog)
+                _indexes[catalog] = index
+    return index
@@ -0,0 +1,121 @@
+"""
+Per-table revision counters for conditional GETs.
+
+Every flush or bulk statement that writes a tracked table bumps that table's
+counter in table_revisions, inside the same transaction as the write. Read
+endpoints derive an ETag and Last-Modified from the counters of the tables
+they depend on, so an unchanged response costs one small counter query and
+a 304 instead of a full query and serialization.
+"""
+
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+
+from fastapi import Response
+from sqlalchemy import event, update, insert, select
+
+from models import TableRevision
+from base import SessionLocal
+
+TRACKED_TABLES = ("students", "internships", "employers", "matches")
+
+
+def ensure_revisions(engine):
+    """Create a counter row for every tracked table that doesn't have one yet."""
+    with engine.begin() as conn:
+        existing = {row[0] for row in conn.execute(select(TableRevision.table_name))}
+        missing = [name for name in TRACKED_TABLES if name not in existing]
+        if missing:
+            conn.execute(insert(TableRevision), [
+                {"table_name": name, "revision": 0, "updated_at": datetime.utcnow()} for name in missing
+            ])
+
+
+def _bump(connection, tables):
+    tables = sorted(set(tables) & set(TRACKED_TABLES))
+    if not tables:
+        return
+    now = datetime.utcnow()
+    result = connection.execute(
+        update(TableRevision)
+        .where(TableRevision.table_name.in_(tables))
+        .values(revision=TableRevision.revision + 1, updated_at=now)
+    )
+    if result.rowcount < len(tables):
+        # A database that predates ensure_revisions: start the missing counters
+        existing = {row[0] for row in connection.execute(
+            select(TableRevision.table_name).where(TableRevision.table_name.in_(tables))
+        )}
+        connection.execute(insert(TableRevision), [
+            {"table_name": name, "revision": 1, "updated_at": now} for name in tables if name not in existing
+        ])
+
+
+@event.listens_for(SessionLocal, "after_flush")
+def _bump_after_flush(session, flush_context):
+    # Still the pre-flush collections here, i.e. exactly what was written
+    tables = {obj.__table__.name for obj in (*session.new, *session.dirty, *session.deleted)}
+    _bump(session.connection(), tables)
+
+
+@event.listens_for(SessionLocal, "do_orm_execute")
+def _bump_on_bulk_write(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        table = getattr(orm_execute_state.statement, "table", None)
+        if table is not None:
+            _bump(orm_execute_state.session.connection(), [table.name])
+
+
+class RevisionValidators:
+    """ETag and Last-Modified for a response built from some tables."""
+
+    def __init__(self, key: str, revisions):
+        self.revisions = {name: revision for name, revision, _ in revisions}
+        parts = [f"{name}.{revision}" for name, revision, _ in revisions]
+        self.etag = f'W/"{key}:{"-".join(parts)}"'
+        updated = [updated_at for _, _, updated_at in revisions if updated_at]
+        self.last_modified = max(updated).replace(microsecond=0, tzinfo=timezone.utc) if updated else None
+
+    @property
+    def headers(self) -> dict:
+        headers = {"ETag": self.etag, "Cache-Control": "no-cache"}
+        if self.last_modified:
+            headers["Last-Modified"] = format_datetime(self.last_modified, usegmt=True)
+        return headers
+
+    def is_fresh(self, request) -> bool:
+        """True if the client's cached copy is still current."""
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match is not None:
+            # Weak comparison: W/"x" and "x" are the same validator
+            tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+            return "*" in tags or self.etag.removeprefix("W/") in tags
+
+        if_modified_since = request.headers.get("if-modified-since")
+        if if_modified_since and self.last_modified:
+            try:
+                return self.last_modified <= parsedate_to_datetime(if_modified_since)
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def not_modified(self) -> Response:
+        return Response(status_code=304, headers=self.headers)
+
+
+def revision_validators(db, tables, key: str) -> RevisionValidators:
+    """Read the counters for the given tables (one query)."""
+    rows = db.execute(
+        select(TableRevision.table_name, TableRevision.revision, TableRevision.updated_at)
+        .where(TableRevision.table_name.in_(tables))
+        .order_by(TableRevision.table_name)
+    ).all()
+    return RevisionValidators(key, rows)
+
+
+def table_revision(db, table: str) -> int:
+    """Current counter of one table (0 if it has never been written)."""
+    revision = db.execute(
+        select(TableRevision.revision).where(TableRevision.table_name == table)
+    ).scalar()
+    return revision or 0
@@ -0,0 +1,168 @@
+"""
+Ranked full-text search over internships.
+
+SQLite: an FTS5 table indexes title, description, domain and required skills
+(the JSON list's text tokenizes into the skill words). It is an external
+content table over internships, so the text isn't stored twice, and triggers
+on internships keep it in sync with every insert, update and delete, whatever
+code path issues them. Results are ranked by bm25 with the title weighted
+highest.
+
+PostgreSQL: a GIN index on a weighted tsvector expression over the same
+columns. The index is maintained by PostgreSQL itself; queries repeat the
+expression verbatim so the planner can use it, and rank with ts_rank_cd.
+
+Any other database, or a SQLite build without FTS5, falls back to unranked
+LIKE matching.
+
+Query words are matched as prefixes of indexed words, all of them required,
+so "mach learn" finds "Machine Learning Intern". ensure_search_index()
+creates the index and backfills it; migrations.upgrade() calls it.
+"""
+
+import re
+
+from sqlalchemy import select, func, text, and_, or_, literal_column, table, column, cast, String
+
+from models import Internship
+
+FTS_TABLE = "internships_fts"
+# bm25 weights, in FTS column order: title, description, domain, required_skills
+FTS_RANK = "bm25(10.0, 1.0, 4.0, 5.0)"
+
+SEARCH_VECTOR = (
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(domain, '') || ' ' || coalesce(required_skills::text, '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce(description, '')), 'C')"
+)
+PG_SEARCH_INDEX = "ix_internships_search"
+
+SEARCH_COLUMNS = (
+    Internship.id.label("internship_id"), Internship.title, Internship.description,
+    Internship.required_skills, Internship.domain, Internship.min_cgpa, Internship.min_year,
+    Internship.positions_available
+)
+MAX_QUERY_WORDS = 16
+
+_fts = table(FTS_TABLE, column("rowid"), column("rank"))
+
+_SQLITE_DDL = [
+    f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+    "title, description, domain, required_skills, content='internships', content_rowid='id')",
+    f"CREATE TRIGGER {FTS_TABLE}_insert AFTER INSERT ON internships BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, title, description, domain, required_skills) "
+    "VALUES (new.id, new.title, new.description, new.domain, new.required_skills); END",
+    f"CREATE TRIGGER {FTS_TABLE}_delete AFTER DELETE ON internships BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description, domain, required_skills) "
+    "VALUES ('delete', old.id, old.title, old.description, old.domain, old.required_skills); END",
+    f"CREATE TRIGGER {FTS_TABLE}_update AFTER UPDATE OF title, description, domain, required_skills "
+    f"ON internships BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description, domain, required_skills) "
+    "VALUES ('delete', old.id, old.title, old.description, old.domain, old.required_skills); "
+    f"INSERT INTO {FTS_TABLE}(rowid, title, description, domain, required_skills) "
+    "VALUES (new.id, new.title, new.description, new.domain, new.required_skills); END",
+    # Index what is already there, and make ORDER BY rank use the weights
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rank) VALUES ('rank', '{FTS_RANK}')",
+]
+
+
+def search_backend(conn) -> str:
+    """"fts5", "tsvector" or "like", depending on what the database supports."""
+    dialect = conn.dialect.name
+    if dialect == "postgresql":
+        return "tsvector"
+    if dialect == "sqlite" and conn.execute(text("SELECT sqlite_compileoption_used('ENABLE_FTS5')")).scalar():
+        return "fts5"
+    return "like"
+
+
+def ensure_search_index(engine) -> bool:
+    """Create the search index (and its triggers) if missing; True if it was created."""
+    with engine.begin() as conn:
+        backend = search_backend(conn)
+        if backend == "fts5":
+            exists = conn.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": FTS_TABLE}
+            ).first()
+            if exists:
+                return False
+            for statement in _SQLITE_DDL:
+                conn.execute(text(statement))
+            return True
+        if backend == "tsvector":
+            exists = conn.execute(
+                text("SELECT 1 FROM pg_indexes WHERE indexname = :name"), {"name": PG_SEARCH_INDEX}
+            ).first()
+            if exists:
+                return False
+            conn.execute(text(f"CREATE INDEX {PG_SEARCH_INDEX} ON internships USING GIN (({SEARCH_VECTOR}))"))
+            return True
+    return False
+
+
+def query_words(query: str) -> list:
+    """Lowercased words of a user query; punctuation and operators are dropped."""
+    return re.findall(r"\w+", query.lower())[:MAX_QUERY_WORDS]
+
+
+def search_internships(db, query: str, cgpa=None, year_of_study=None, limit: int = 20, offset: int = 0) -> dict:
+    """
+    Active internships matching every word of `query`, best match first.
+    With cgpa / year_of_study, only internships whose min_cgpa / min_year
+    that student meets.
+    """
+    words = query_words(query)
+    page = {"query": query, "total": 0, "limit": limit, "offset": offset, "results": []}
+    if not words:
+        return page
+
+    filters = [Internship.is_active == True]
+    if cgpa is not None:
+        filters.append(or_(Internship.min_cgpa.is_(None), Internship.min_cgpa <= cgpa))
+    if year_of_study is not None:
+        filters.append(or_(Internship.min_year.is_(None), Internship.min_year <= year_of_study))
+
+    backend = search_backend(db.connection())
+    if backend == "fts5":
+        # Every word quoted (no FTS5 syntax gets through) and prefix-matched
+        match = text(f"{FTS_TABLE} MATCH :match").bindparams(
+            match=" ".join(f'"{word}"*' for word in words)
+        )
+        # The unary + keeps SQLite from driving the join from internships
+        # and running the MATCH once per row: the FTS table has to come first
+        source = _fts.join(Internship.__table__, Internship.id == literal_column(f"+{FTS_TABLE}.rowid"))
+        filters.append(match)
+        score = -_fts.c.rank
+        order = (_fts.c.rank, Internship.id)
+    elif backend == "tsvector":
+        vector = literal_column(f"({SEARCH_VECTOR})")
+        tsquery = func.to_tsquery("english", " & ".join(f"{word}:*" for word in words))
+        source = Internship.__table__
+        filters.append(vector.op("@@")(tsquery))
+        score = func.ts_rank_cd(vector, tsquery)
+        order = (score.desc(), Internship.id)
+    else:
+        haystack = func.lower(
+            func.coalesce(Internship.title, "") + " " + func.coalesce(Internship.description, "") + " "
+            + func.coalesce(Internship.domain, "") + " " + func.coalesce(cast(Internship.required_skills, String), "")
+        )
+        source = Internship.__table__
+        filters.extend(haystack.contains(word, autoescape=True) for word in words)
+        score = literal_column("NULL")
+        order = (Internship.id,)
+
+    condition = and_(*filters)
+    page["total"] = db.execute(select(func.count()).select_from(source).where(condition)).scalar()
+    if page["total"] > offset:
+        rows = db.execute(
+            select(*SEARCH_COLUMNS, score.label("score"))
+            .select_from(source).where(condition)
+            .order_by(*order).limit(limit).offset(offset)
+        )
+        keys = list(rows.keys())
+        page["results"] = [dict(zip(keys, row)) for row in rows]
+        for result in page["results"]:
+            if result["score"] is not None:
+                result["score"] = round(float(result["score"]), 4)
+    return page
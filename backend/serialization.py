@@ -0,0 +1,47 @@
+"""
+Fast response serialization.
+
+List endpoints select plain column tuples instead of ORM instances (no identity
+map, no attribute instrumentation, no lazy loads) and hand lists of dicts
+straight to an orjson-backed response, skipping FastAPI's jsonable_encoder.
+"""
+
+from sqlalchemy import select
+
+from models import Student, Internship, Employer, Match
+
+STUDENT_COLUMNS = (
+    Student.id, Student.email, Student.full_name, Student.degree, Student.year_of_study,
+    Student.cgpa, Student.skills, Student.preferences, Student.resume_url, Student.is_active
+)
+INTERNSHIP_COLUMNS = (
+    Internship.id, Internship.employer_id, Internship.title, Internship.description,
+    Internship.required_skills, Internship.min_cgpa, Internship.min_year,
+    Internship.positions_available, Internship.domain, Internship.is_active
+)
+EMPLOYER_COLUMNS = (
+    Employer.id, Employer.email, Employer.company_name, Employer.industry,
+    Employer.description, Employer.is_active
+)
+MATCH_COLUMNS = (
+    Match.id, Match.student_id, Match.internship_id, Match.match_score, Match.status
+)
+
+
+def fetch_dicts(db, statement):
+    """Execute a column select and return its rows as plain dicts."""
+    result = db.execute(statement)
+    keys = list(result.keys())
+    return [dict(zip(keys, row)) for row in result]
+
+
+def list_rows(db, columns, order_by=None):
+    statement = select(*columns)
+    if order_by is not None:
+        statement = statement.order_by(order_by)
+    return fetch_dicts(db, statement)
+
+
+def row_dict(obj, columns) -> dict:
+    """Serialize a single ORM instance to the same shape as its list rows."""
+    return {column.key: getattr(obj, column.key) for column in columns}
@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+Versioned, memory-mapped catalog snapshot files shared across workers.
+
+Every uvicorn worker used to build its own CatalogSnapshot from a full scan
+of the internships table, at startup and again after every catalog change,
+and hold a private copy of it. Instead, the snapshot is written once to a
+file under CATALOG_SNAPSHOT_DIR and every worker maps that file read-only:
+the arrays are NumPy views straight onto the page cache, so N workers share
+one physical copy and starting a worker costs an mmap, not a DB scan.
+
+File layout (all integers little-endian):
+
+    8 bytes   magic b"CATSNAP1"
+    8 bytes   header length
+    header    JSON: version, shape, domains, vocabulary, and for each array
+              its dtype, shape and offset from the start of the data
+    data      the arrays, each aligned to 64 bytes
+
+Catalogs of at least ANN_MIN_CATALOG internships also carry their MinHash
+LSH index (retrieval.py): its parameters in the header under "minhash" and
+its arrays with the others. It is built once, by the publishing process, and
+mapped and shared like the catalog itself.
+
+A snapshot's version is the revision counter of the internships table (see
+revisions.py) it was built at. The CURRENT file in the directory names the
+published snapshot and is replaced atomically (write, fsync, os.replace), so
+readers see either the old or the new snapshot, never a partial one. Workers
+compare the mapped version with the counter every
+CATALOG_SNAPSHOT_CHECK_SECONDS (one single-row query) and after their own
+writes; the first one to see a new revision rebuilds and publishes the file
+under a lock, the others wait and map it. Superseded files are deleted after
+CATALOG_SNAPSHOT_KEEP newer ones exist; a worker still mapping one keeps its
+pages until it lets go of the snapshot.
+
+    python snapshot_store.py    # publish a snapshot before starting workers
+"""
+
+import json
+import mmap
+import os
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, a duplicate build is harmless
+    fcntl = None
+
+from base import SessionLocal
+from catalog import CatalogSnapshot, PackedStrings, load_catalog, CATALOG_SNAPSHOT_DIR
+from revisions import table_revision
+from retrieval import ANN_MIN_CATALOG, MinHashIndex, set_minhash_index
+
+CATALOG_SNAPSHOT_KEEP = int(os.environ.get("CATALOG_SNAPSHOT_KEEP", "2"))
+
+MINHASH_ARRAYS = ("minhash_rows", "minhash_sorted_keys", "minhash_sorted_rows")
+
+MAGIC = b"CATSNAP1"
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+POINTER_FILE = "CURRENT"
+LOCK_FILE = "publish.lock"
+
+
+def _snapshot_arrays(catalog) -> dict:
+    arrays = {
+        "ids": catalog.ids,
+        "min_cgpa": catalog.min_cgpa,
+        "min_year": catalog.min_year,
+        "positions": catalog.positions,
+        "domain_codes": catalog.domain_codes,
+        "skills_data": catalog.skills.data,
+        "skills_indices": catalog.skills.indices,
+        "skills_indptr": catalog.skills.indptr,
+        "skill_sq_norms": catalog.skill_sq_norms
+    }
+    # Presence and squares share the count matrix's structure; only their
+    # values are stored, and only when they differ from the counts
+    if catalog.skill_presence is not catalog.skills:
+        arrays["presence_data"] = catalog.skill_presence.data
+        arrays["squares_data"] = catalog.skill_squares.data
+    for name in ("titles", "descriptions", "required_skills"):
+        packed = getattr(catalog, name)
+        arrays[f"{name}_buffer"] = np.frombuffer(packed.buffer, dtype=np.uint8)
+        arrays[f"{name}_offsets"] = packed.offsets
+    return arrays
+
+
+def _aligned(offset: int) -> int:
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def write_snapshot(catalog, version: int, path: str, minhash_index=None):
+    """Write a catalog snapshot file (not atomically; see publish_snapshot)."""
+    arrays = _snapshot_arrays(catalog)
+    if minhash_index is not None:
+        arrays.update(zip(MINHASH_ARRAYS, minhash_index.arrays()))
+    arrays = {name: np.ascontiguousarray(array) for name, array in arrays.items()}
+    layout = {}
+    offset = 0
+    for name, array in arrays.items():
+        offset = _aligned(offset)
+        layout[name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+        offset += array.nbytes
+
+    header = json.dumps({
+        "format": FORMAT_VERSION,
+        "version": version,
+        "created_at": datetime.utcnow().isoformat(),
+        "shape": list(catalog.skills.shape),
+        "domains": list(catalog.domains),
+        "vocabulary": list(catalog.vocabulary),
+        "minhash": minhash_index.params if minhash_index is not None else None,
+        "arrays": layout
+    }).encode("utf-8")
+    data_start = _aligned(len(MAGIC) + 8 + len(header))
+
+    with open(path, "wb") as f:
+        f.write(MAGIC)
+        f.write(len(header).to_bytes(8, "little"))
+        f.write(header)
+        for name, array in arrays.items():
+            f.write(b"\0" * (data_start + layout[name]["offset"] - f.tell()))
+            f.write(array.data)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def open_snapshot(path: str) -> CatalogSnapshot:
+    """Map a snapshot file; the returned snapshot's arrays are read-only views of it."""
+    with open(path, "rb") as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if mapped[:len(MAGIC)] != MAGIC:
+        raise ValueError(f"{path} is not a catalog snapshot")
+    header_length = int.from_bytes(mapped[len(MAGIC):len(MAGIC) + 8], "little")
+    header_start = len(MAGIC) + 8
+    header = json.loads(mapped[header_start:header_start + header_length])
+    if header["format"] != FORMAT_VERSION:
+        raise ValueError(f"{path} has unsupported format {header['format']}")
+    data_start = _aligned(header_start + header_length)
+
+    arrays = {}
+    for name, spec in header["arrays"].items():
+        dtype = np.dtype(spec["dtype"])
+        count = int(np.prod(spec["shape"]))
+        arrays[name] = np.frombuffer(
+            mapped, dtype=dtype, count=count, offset=data_start + spec["offset"]
+        ).reshape(spec["shape"])
+
+    shape = tuple(header["shape"])
+    indices, indptr = arrays["skills_indices"], arrays["skills_indptr"]
+    skills = csr_matrix((arrays["skills_data"], indices, indptr), shape=shape, copy=False)
+    if "presence_data" in arrays:
+        presence = csr_matrix((arrays["presence_data"], indices, indptr), shape=shape, copy=False)
+        squares = csr_matrix((arrays["squares_data"], indices, indptr), shape=shape, copy=False)
+    else:
+        presence = squares = skills
+
+    snapshot = CatalogSnapshot(
+        ids=arrays["ids"],
+        min_cgpa=arrays["min_cgpa"],
+        min_year=arrays["min_year"],
+        positions=arrays["positions"],
+        domain_codes=arrays["domain_codes"],
+        domains=header["domains"],
+        skills=skills,
+        vocabulary=header["vocabulary"],
+        titles=PackedStrings(arrays["titles_buffer"], arrays["titles_offsets"]),
+        descriptions=PackedStrings(arrays["descriptions_buffer"], arrays["descriptions_offsets"]),
+        required_skills=PackedStrings(arrays["required_skills_buffer"], arrays["required_skills_offsets"]),
+        skill_presence=presence,
+        skill_squares=squares,
+        skill_sq_norms=arrays["skill_sq_norms"]
+    )
+    snapshot.version = header["version"]
+    if header.get("minhash"):
+        set_minhash_index(snapshot, MinHashIndex(
+            arrays=tuple(arrays[name] for name in MINHASH_ARRAYS), **header["minhash"]
+        ))
+    return snapshot
+
+
+def read_pointer(directory: str = CATALOG_SNAPSHOT_DIR):
+    """The published snapshot as {"version", "file"}, or None if there is none."""
+    try:
+        with open(os.path.join(directory, POINTER_FILE), "rb") as f:
+            return json.loads(f.read())
+    except (OSError, ValueError):
+        return None
+
+
+def _replace_atomically(path: str, content: bytes):
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(content)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+
+def _fsync_directory(directory: str):
+    if hasattr(os, "O_DIRECTORY"):
+        fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+def publish_snapshot(catalog, version: int, directory: str = CATALOG_SNAPSHOT_DIR) -> str:
+    """Write a snapshot file and make it the current one; returns its path."""
+    os.makedirs(directory, exist_ok=True)
+    # Unique name per build: a database that was reset starts its revisions
+    # over, and a file that is still mapped can't be replaced on Windows
+    filename = f"catalog-{version:010d}-{time.time_ns():x}.snap"
+    path = os.path.join(directory, filename)
+    # Built here, once, rather than by every worker on its first large query
+    minhash_index = MinHashIndex(catalog) if len(catalog) >= ANN_MIN_CATALOG else None
+    write_snapshot(catalog, version, f"{path}.tmp", minhash_index)
+    os.replace(f"{path}.tmp", path)
+    _replace_atomically(
+        os.path.join(directory, POINTER_FILE),
+        json.dumps({"version": version, "file": filename}).encode("utf-8")
+    )
+    _fsync_directory(directory)
+    _prune(directory, keep=filename)
+    return path
+
+
+def _prune(directory: str, keep: str):
+    snapshots = sorted(
+        (name for name in os.listdir(directory) if name.startswith("catalog-") and name.endswith(".snap")),
+        key=lambda name: os.path.getmtime(os.path.join(directory, name)),
+        reverse=True
+    )
+    for name in [name for name in snapshots if name != keep][CATALOG_SNAPSHOT_KEEP:]:
+        try:
+            os.remove(os.path.join(directory, name))
+        except OSError:
+            pass  # Still mapped by a worker on Windows; removed on a later publish
+
+
+@contextmanager
+def _publish_lock(directory: str):
+    os.makedirs(directory, exist_ok=True)
+    if fcntl is None:
+        yield
+        return
+    with open(os.path.join(directory, LOCK_FILE), "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _open_published(directory: str, revision: int):
+    pointer = read_pointer(directory)
+    if pointer is None or pointer.get("version") != revision:
+        return None
+    try:
+        return open_snapshot(os.path.join(directory, pointer["file"]))
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def publish_from_db(directory: str = CATALOG_SNAPSHOT_DIR) -> str:
+    """Build a snapshot from the database and publish it; returns its path."""
+    db = SessionLocal()
+    try:
+        # Counter first: a write landing in between gives the snapshot newer
+        # rows than its version says, which only causes one extra rebuild
+        revision = table_revision(db, "internships")
+        catalog = load_catalog(db)
+    finally:
+        db.close()
+    return publish_snapshot(catalog, revision, directory)
+
+
+def current_snapshot(mapped=None, directory: str = CATALOG_SNAPSHOT_DIR) -> CatalogSnapshot:
+    """
+    The snapshot for the current catalog revision: `mapped` if it still is,
+    else the published file, else a fresh build published for the others.
+    """
+    db = SessionLocal()
+    try:
+        revision = table_revision(db, "internships")
+    finally:
+        db.close()
+    if mapped is not None and mapped.version == revision:
+        return mapped
+
+    snapshot = _open_published(directory, revision)
+    if snapshot is None:
+        with _publish_lock(directory):
+            # Another worker may have published it while we waited
+            snapshot = _open_published(directory, revision)
+            if snapshot is None:
+                snapshot = open_snapshot(publish_from_db(directory))
+    return snapshot
+
+
+def main():
+    directory = CATALOG_SNAPSHOT_DIR or "snapshots"
+    with _publish_lock(directory):
+        path = publish_from_db(directory)
+    snapshot = open_snapshot(path)
+    print(f"Published {path}: version {snapshot.version}, {len(snapshot)} internships, "
+          f"{os.path.getsize(path) / 1024:.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+"""
+Persisted per-student scoring features.
+
+Scoring needs only a few derived values per student: skill token counts, the
+lowercased preferences, the CGPA and its score, and whether there is a
+resume. Deriving them means loading the full Student row through the ORM
+(decoding its JSON columns) and tokenizing the skills, on every match
+request and again for every student of every batch, sweep and recompute.
+
+Instead they are computed once, when a student is created or updated, and
+stored as one compact record per student in student_features. Flush hooks on
+SessionLocal keep the records in step with every flush that writes or deletes
+students, whatever code path issues it, and bulk deletes of students drop
+their records too. load_student_features() reads the
+records (load_features() for a single student), and every matching path
+builds its StudentFeatures from them.
+
+Records written by an older FEATURE_VERSION (or missing, for students written
+before the table existed) are recomputed from the student on load, and
+replaced by ensure_student_features(), which migrations.upgrade() calls.
+"""
+
+import orjson
+from sqlalchemy import event, select, delete, insert, inspect, bindparam
+
+from models import Student, StudentFeature
+from base import SessionLocal
+from catalog import analyze_skills
+
+# Bump when the record format or the skill tokenizer changes
+FEATURE_VERSION = 1
+# Student attributes the features are derived from
+FEATURE_ATTRIBUTES = ("skills", "preferences", "cgpa", "resume_url")
+BACKFILL_CHUNK_SIZE = 1000
+
+
+class StudentFeatures:
+    """
+    The parts of a student that scoring needs, derived once per student
+    instead of once per (student, internship) pair.
+    """
+
+    def __init__(self, student_id, skill_counts, cgpa, cgpa_score, preferences, has_resume):
+        self.student_id = student_id
+        self.skill_counts = skill_counts  # token -> count, tokenized like TfidfVectorizer
+        self.skill_sq_norm = float(sum(count * count for count in skill_counts.values()))
+        self.cgpa = cgpa
+        self.cgpa_score = cgpa_score  # CGPA normalized to 0-1
+        self.preferences = preferences  # lowercased, space-joined preferences
+        self.has_resume = has_resume
+
+    @classmethod
+    def from_student(cls, student):
+        skill_counts = {}
+        for token in analyze_skills(" ".join(student.skills) if student.skills else ""):
+            skill_counts[token] = skill_counts.get(token, 0) + 1
+        return cls(
+            student_id=student.id,
+            skill_counts=skill_counts,
+            cgpa=student.cgpa,
+            cgpa_score=min(1.0, student.cgpa / 10.0) if student.cgpa is not None else None,
+            # Kept as one string, not a token set: a domain matches when it
+            # occurs anywhere in it, possibly spanning two preferences
+            preferences=" ".join(student.preferences).lower() if student.preferences else "",
+            has_resume=bool(student.resume_url)
+        )
+
+    def encode(self) -> bytes:
+        return orjson.dumps({
+            "skills": self.skill_counts,
+            "cgpa": self.cgpa,
+            "cgpa_score": self.cgpa_score,
+            "preferences": self.preferences,
+            "resume": self.has_resume
+        })
+
+    @classmethod
+    def decode(cls, student_id, payload: bytes):
+        record = orjson.loads(payload)
+        return cls(
+            student_id=student_id,
+            skill_counts=record["skills"],
+            cgpa=record["cgpa"],
+            cgpa_score=record["cgpa_score"],
+            preferences=record["preferences"],
+            has_resume=record["resume"]
+        )
+
+
+def feature_rows(features):
+    return [
+        {"student_id": feature.student_id, "version": FEATURE_VERSION, "payload": feature.encode()}
+        for feature in features
+    ]
+
+
+# Built once: statement construction costs more than running it. Joined to
+# students so a record can never outlive its student.
+_RECORD_BY_ID = (
+    select(StudentFeature.version, StudentFeature.payload)
+    .join(Student, Student.id == StudentFeature.student_id)
+    .where(StudentFeature.student_id == bindparam("student_id"))
+)
+
+
+def load_features(db, student_id: int):
+    """StudentFeatures of one student (None if there is no such student)."""
+    record = db.connection().execute(_RECORD_BY_ID, {"student_id": student_id}).first()
+    if record is not None and record.version == FEATURE_VERSION:
+        return StudentFeatures.decode(student_id, record.payload)
+    student = db.get(Student, student_id)
+    return StudentFeatures.from_student(student) if student is not None else None
+
+
+def load_student_features(db, *criteria, limit=None):
+    """
+    StudentFeatures of the students matching the given filters on Student,
+    in id order (at most `limit` of them). Reads the stored records, and
+    only falls back to loading and deriving from the student for those
+    without a current one.
+    """
+    query = (
+        select(Student.id, StudentFeature.version, StudentFeature.payload)
+        .outerjoin(StudentFeature, StudentFeature.student_id == Student.id)
+        .where(*criteria)
+        .order_by(Student.id)
+    )
+    if limit is not None:
+        query = query.limit(limit)
+
+    features = []
+    stale = {}
+    # Plain columns: run on the connection, skipping the ORM execution layer
+    for student_id, version, payload in db.connection().execute(query):
+        if version == FEATURE_VERSION:
+            features.append(StudentFeatures.decode(student_id, payload))
+        else:
+            stale[student_id] = len(features)
+            features.append(None)
+    if stale:
+        for student in db.query(Student).filter(Student.id.in_(list(stale))):
+            features[stale[student.id]] = StudentFeatures.from_student(student)
+    return features
+
+
+def ensure_student_features(engine) -> int:
+    """Write a current record for every student lacking one; returns how many."""
+    written = 0
+    after_id = 0
+    with SessionLocal(bind=engine) as db:
+        while True:
+            students = (
+                db.query(Student)
+                .outerjoin(StudentFeature, StudentFeature.student_id == Student.id)
+                .filter(Student.id > after_id)
+                .filter((StudentFeature.version == None) | (StudentFeature.version != FEATURE_VERSION))
+                .order_by(Student.id)
+                .limit(BACKFILL_CHUNK_SIZE)
+                .all()
+            )
+            if not students:
+                return written
+            after_id = students[-1].id
+            ids = [student.id for student in students]
+            db.execute(delete(StudentFeature).where(StudentFeature.student_id.in_(ids)))
+            db.execute(insert(StudentFeature), feature_rows(
+                StudentFeatures.from_student(student) for student in students
+            ))
+            db.commit()
+            db.expunge_all()
+            written += len(students)
+
+
+def _features_changed(student) -> bool:
+    state = inspect(student)
+    return any(state.attrs[name].history.has_changes() for name in FEATURE_ATTRIBUTES)
+
+
+@event.listens_for(SessionLocal, "before_flush")
+def _drop_features_before_flush(session, flush_context, instances):
+    # Before the students themselves go, so the foreign key never dangles
+    deleted = [obj.id for obj in session.deleted if isinstance(obj, Student)]
+    if deleted:
+        session.connection().execute(delete(StudentFeature).where(StudentFeature.student_id.in_(deleted)))
+
+
+@event.listens_for(SessionLocal, "do_orm_execute")
+def _drop_features_on_bulk_delete(orm_execute_state):
+    # query(Student).delete() and delete(Student) never reach the flush hooks
+    if not orm_execute_state.is_delete:
+        return
+    statement = orm_execute_state.statement
+    table = getattr(statement, "table", None)
+    if table is None or table.name != Student.__tablename__:
+        return
+    students = select(Student.id)
+    if statement.whereclause is not None:
+        students = students.where(statement.whereclause)
+    orm_execute_state.session.connection().execute(
+        delete(StudentFeature).where(StudentFeature.student_id.in_(students))
+    )
+
+
+@event.listens_for(SessionLocal, "after_flush")
+def _store_features_after_flush(session, flush_context):
+    # Still the pre-flush collections and attribute history here, but the
+    # new students already have their ids
+    changed = [obj for obj in session.new if isinstance(obj, Student)]
+    changed += [obj for obj in session.dirty if isinstance(obj, Student) and _features_changed(obj)]
+    if not changed:
+        return
+    connection = session.connection()
+    connection.execute(delete(StudentFeature).where(
+        StudentFeature.student_id.in_([student.id for student in changed])
+    ))
+    connection.execute(insert(StudentFeature), feature_rows(
+        StudentFeatures.from_student(student) for student in changed
+    ))
@@ -1,27 +1,52 @@
-import { useState } from 'react'
+import { useState, useRef, useEffect } from 'react'
 import {
-  Container, Typography, TextField, Button, Card, CardContent, Grid, Chip, Box
+  Container, Typography, TextField, Button, Card, CardContent, Grid, Chip, Box, LinearProgress
 } from '@mui/material'
-import { Search } from '@mui/icons-material'
-import axios from 'axios'
+import { Search, Stop } from '@mui/icons-material'
 
 function MatchFinder() {
   const [studentId, setStudentId] = useState('')
   const [matches, setMatches] = useState([])
   const [loading, setLoading] = useState(false)
+  const [progress, setProgress] = useState(null)
+  const sourceRef = useRef(null)
 
-  const handleSearch = async () => {
+  const stopStream = () => {
+    if (sourceRef.current) {
+      sourceRef.current.close()
+      sourceRef.current = null
+    }
+    setLoading(false)
+  }
+
+  // Don't leave the stream open when navigating away
+  useEffect(() => stopStream, [])
+
+  const handleSearch = () => {
     if (!studentId) return
 
+    stopStream()
+    setMatches([])
+    setProgress(null)
     setLoading(true)
-    try {
-      const response = await axios.get(`/api/matches/${studentId}`)
-      setMatches(response.data)
-    } catch (error) {
+
+    // The best matches so far arrive as the catalog is scored, then a final
+    // "done" event once they have been saved
+    const source = new EventSource(`/api/matches/${studentId}/stream`)
+    sourceRef.current = source
+    source.addEventListener('progress', (event) => {
+      const data = JSON.parse(event.data)
+      setMatches(data.matches)
+      setProgress({ scored: data.scored, total: data.total })
+    })
+    source.addEventListener('done', (event) => {
+      setMatches(JSON.parse(event.data).matches)
+      stopStream()
+    })
+    source.onerror = (error) => {
+      stopStream()
       console.error('Error fetching matches:', error)
       alert('Error fetching matches. Please check the student ID.')
-    } finally {
-      setLoading(false)
     }
   }
 
@@ -43,22 +68,31 @@ function MatchFinder() {
             <Grid item xs={12} sm={4}>
               <Button
                 variant="contained"
-                onClick={handleSearch}
-                disabled={!studentId || loading}
-                startIcon={<Search />}
+                color={loading ? 'secondary' : 'primary'}
+                onClick={loading ? stopStream : handleSearch}
+                disabled={!studentId}
+                startIcon={loading ? <Stop /> : <Search />}
                 fullWidth
                 sx={{ height: 56 }}
               >
-                {loading ? 'Searching...' : 'Find Matches'}
+                {loading ? 'Stop' : 'Find Matches'}
               </Button>
             </Grid>
           </Grid>
+          {loading && progress && progress.total > 0 && (
+            <Box sx={{ mt: 2 }}>
+              <LinearProgress variant="determinate" value={(progress.scored / progress.total) * 100} />
+              <Typography variant="caption" color="text.secondary">
+                Scored {progress.scored} of {progress.total} internships
+              </Typography>
+            </Box>
+          )}
         </CardContent>
       </Card>
 
       {matches.length > 0 && (
         <Box>
-          <Typography variant="h5" gutterBottom>Top Matches</Typography>
+          <Typography variant="h5" gutterBottom>{loading ? 'Best Matches So Far' : 'Top Matches'}</Typography>
           <Grid container spacing={3}>
             {matches.map((match, index) => (
               <Grid item xs={12} md={6} key={index}>